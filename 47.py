@@ -1,19 +1,26 @@
 import asyncio
-import json
+import atexit
+import contextlib
+import functools
 import logging
+import logging.handlers
 import os
+import queue
 import re
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
+from urllib.parse import urlparse
 from typing import Dict, List, Optional, Tuple, Any, Callable
-import aiofiles
+import aiosqlite
 import httpx
-import pandas as pd
-import numpy as np
+import orjson
 from collections import defaultdict
 from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import TelegramError
+from telegram.request import HTTPXRequest
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     CommandHandler,
     CallbackQueryHandler,
@@ -25,22 +32,239 @@ from telegram.ext import (
 # Load environment variables
 
 # Configure logging
+# Records are queued by the calling thread and written by a listener thread,
+# so a burst of errors never blocks the event loop on console I/O
+log_queue = queue.SimpleQueue()
+log_output = logging.StreamHandler()
+log_output.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+log_listener = logging.handlers.QueueListener(log_queue, log_output)
 logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+    handlers=[logging.handlers.QueueHandler(log_queue)],
+    format='%(message)s',  # The listener's handler applies the real format
+    level=os.getenv('LOG_LEVEL', 'INFO').upper()
 )
+# httpx logs every request at INFO
+logging.getLogger('httpx').setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
+USER_DATA_DB = 'users.db'
+# Previous JSON user data, imported into USER_DATA_DB on first start
+USER_DATA_FILE = 'users.json'
+USER_DATA_FLUSH_DELAY = 2.0  # Seconds to collect further changes before writing
+LOCK_FILE = 'trading_bot.lock'
+USER_CONCURRENCY_LIMIT = 3  # Network-bound commands one user may run at once
+FANOUT_CONCURRENCY_LIMIT = 8  # Non-blocking multi-source commands running across all users
+PRICE_CACHE_TTL = 20  # Seconds a token price is reused
+BALANCE_BATCH_WINDOW = 0.02  # Seconds to collect balance lookups into one RPC
+BALANCE_BATCH_SIZE = 32  # Wallets per getMultipleAccounts call (RPC max is 100)
+HTTP_RETRIES = 2  # Extra attempts for rate-limited or failed API requests
+HTTP_MAX_RETRY_DELAY = 5.0  # Seconds; keeps a long Retry-After from stalling a reply
+
+START_TEXT = (
+    "🤖 *Advanced Trading Bot*\n\n"
+    "✅ Real-time Solana, Forex, and DeFi analytics\n\n"
+    "🔧 *Setup Guide:*\n"
+    "1. Use /register YOUR_WALLET_ADDRESS\n"
+    "2. Set API keys in environment:\n"
+    "   - BIRDEYE_API_KEY\n"
+    "   - APILAYER_API_KEY\n"
+    "   - COINGECKO_API_KEY\n\n"
+    "Choose an option or use /help for commands:"
+)
+
+# Telegram objects are immutable, so the static menu is built once and reused
+START_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📊 Portfolio", callback_data="portfolio"),
+     InlineKeyboardButton("🔍 Scan Markets", callback_data="scan")],
+    [InlineKeyboardButton("🐦 BirdEye", callback_data="birdeye"),
+     InlineKeyboardButton("🔥 Trending", callback_data="trending")],
+    [InlineKeyboardButton("🚀 Pump.fun", callback_data="pumpfun"),
+     InlineKeyboardButton("📈 Top Gainers", callback_data="top_gainers")],
+    [InlineKeyboardButton("💱 Forex Rates", callback_data="forex"),
+     InlineKeyboardButton("🤖 AI Analysis", callback_data="ai_analysis")]
+])
+
+HELP_TEXT = """
+🤖 *Trading Bot Commands*
+
+*Essential Setup*
+/register <wallet> - Link your Solana wallet
+/setup - API setup instructions
+
+*Account Management*
+/status - Account status
+/balance - Check SOL balance
+
+*Portfolio Management*
+/portfolio - Show holdings with real prices
+/watch <token> - Add to watchlist
+/watchlist - View watchlist with live prices
+/alert <token> <above|below> <price> - Set price alert
+/buy <token> <amount> - Simulate buy
+/sell <token> <amount> - Simulate sell
+
+*Market Analysis*
+/scan - Scan trending tokens
+/trending - BirdEye trending tokens
+/top - Top gainers
+/pumpfun - Pump.fun tokens
+/sentiment - Market sentiment
+/ai_analysis <token> - AI token analysis
+
+*Forex Tools*
+/forex - Major forex rates
+/forexpair <from> <to> - Forex pair rate
+/forex_pairs - Major forex pairs
+
+*Advanced Features*
+/advanced_scan - Deep market scan
+/multiscan - Multi-platform overview
+/portfolio_optimizer - Optimize portfolio
+/copy_trading - Copy top traders
+/market_maker - Market making ops
+/defi_opportunities - DeFi yields
+/whales - Whale transactions
+
+*Quick Lookup*
+Type $SYMBOL (e.g. $SOL) for quick price check
+
+*Troubleshooting*
+If commands don't respond:
+1. Check API keys with /setup
+2. Verify wallet with /register
+3. Use valid token symbols
+"""
+
+# Row layouts for the token list commands, formatted into a parts list and
+# joined once instead of growing the message string per token
+TOKEN_ROW_TEMPLATE = (
+    "{i}. *{name} ({symbol})*\n"
+    "   💰 ${price:.6f} | 📈 {change:.1f}%\n"
+    "   💦 Vol: ${volume_k:.1f}K\n\n"
+)
+GAINER_ROW_TEMPLATE = (
+    "{i}. *{name} ({symbol})*\n"
+    "   💰 ${price:.6f} | 📈 {change:.1f}%\n\n"
+)
+SCAN_ROW_TEMPLATE = "• {name} ({symbol}): ${price:.6f} | {change:.1f}%\n"
+
+# Only these update types have handlers; Telegram filters the rest server-side
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+# Base58 alphabet, 32-44 characters (Solana public key)
+SOLANA_ADDRESS_RE = re.compile(r'[1-9A-HJ-NP-Za-km-z]{32,44}')
+# $SYMBOL mentions in chat messages
+TOKEN_MENTION_RE = re.compile(r'\$([a-zA-Z0-9]+)')
+
+def read_user_data(path: str) -> Dict[int, Dict]:
+    """Load the JSON user data file the database replaced"""
+    with open(path, 'rb') as f:
+        data = orjson.loads(f.read())
+    # JSON object keys are strings; handlers look users up by int id
+    return {int(user_id): user for user_id, user in data.items()}
+
+def require_registration(handler: Callable) -> Callable:
+    """Run handler with the caller's user id, or prompt unknown users to /register"""
+    @functools.wraps(handler)
+    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user_id = update.effective_user.id
+        if user_id not in self.users_data:
+            await update.effective_message.reply_text("Please /register first")
+            return
+        return await handler(self, update, context, user_id)
+    return wrapper
+
+def per_user_limit(handler: Callable) -> Callable:
+    """Turn away a user's command while they already have USER_CONCURRENCY_LIMIT running"""
+    @functools.wraps(handler)
+    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE, *args):
+        user_id = update.effective_user.id
+        running = self.user_slots.get(user_id, 0)
+        # Queueing would hold one of the application's update slots while
+        # waiting, so a single user could stall everyone else
+        if running >= USER_CONCURRENCY_LIMIT:
+            await update.effective_message.reply_text("⏳ Still working on your previous requests, please try again shortly")
+            return
+        self.user_slots[user_id] = running + 1
+        try:
+            return await handler(self, update, context, *args)
+        finally:
+            self.user_slots[user_id] -= 1
+            if self.user_slots[user_id] == 0:
+                del self.user_slots[user_id]
+    return wrapper
+
+def fanout_limit(handler: Callable) -> Callable:
+    """Queue a non-blocking command once FANOUT_CONCURRENCY_LIMIT are running across all users"""
+    @functools.wraps(handler)
+    async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE, *args):
+        async with self.fanout_slots:
+            return await handler(self, update, context, *args)
+    return wrapper
+
+class OrjsonRequest(HTTPXRequest):
+    """HTTPXRequest that decodes Telegram responses with orjson"""
+    
+    @staticmethod
+    def parse_json_payload(payload: bytes) -> Dict[str, Any]:
+        try:
+            return orjson.loads(payload)
+        except ValueError as exc:
+            raise TelegramError("Invalid server response") from exc
+
 class TradingBot:
     def __init__(self, token: str):
         self.token = token
-        self.app = Application.builder().token(token).build()
+        # Process updates from different chats concurrently, and keep outbound
+        # messages under Telegram's flood limits instead of hitting FloodWait
+        self.app = (
+            Application.builder()
+            .token(token)
+            .request(OrjsonRequest(
+                http_version="2",
+                connection_pool_size=256,
+                pool_timeout=30.0,
+                connect_timeout=10.0,
+                read_timeout=20.0
+            ))
+            .get_updates_request(OrjsonRequest(
+                http_version="2",
+                connection_pool_size=2,
+                pool_timeout=30.0,
+                connect_timeout=10.0
+            ))
+            .concurrent_updates(True)
+            .rate_limiter(AIORateLimiter(overall_max_rate=28, max_retries=3))
+            .build()
+        )
         self.users_data = {}
         self.watchlists = {}
         self.alerts = {}
-        self.client = httpx.AsyncClient(timeout=30.0)
+        self.user_locks = defaultdict(asyncio.Lock)
+        self.user_slots = {}  # user id -> network-bound commands running
+        self.fanout_slots = asyncio.Semaphore(FANOUT_CONCURRENCY_LIMIT)
+        self.alert_index = defaultdict(set)  # token -> user ids with alerts on it
+        # Shared client so every API call reuses pooled keep-alive connections
+        # Pool settings live on the transport, which also retries failed connects
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=3.0),
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=40, keepalive_expiry=30),
+                retries=2
+            )
+        )
         self.data_cache = {}
-        self.cache_expiry = {}  # Cache expiration timestamps
+        self.cache_expiry = {}  # Cache expiration times (time.monotonic)
+        self.cache_locks = defaultdict(asyncio.Lock)  # Per-key fetch locks
+        
+        # users_data is the source of truth; a background writer persists it
+        self.write_queue = asyncio.Queue()
+        self.db = None  # aiosqlite connection, opened in run()
+        
+        # Balance requests made within BALANCE_BATCH_WINDOW share one RPC call
+        self.balance_waiters = {}  # wallet -> future for its balance
+        self.balance_flush = None  # Task that will resolve balance_waiters
         
         # API keys from environment variables
         self.api_keys = {
@@ -72,14 +296,17 @@ class TradingBot:
             'SOL': self.get_solana_price,
             'ETH': self.get_ethereum_price,
             'BTC': self.get_bitcoin_price,
-            'USDC': lambda: 1.0,
-            'USDT': lambda: 1.0,
+            'USDC': self.get_stablecoin_price,
+            'USDT': self.get_stablecoin_price,
         }
         
         self.setup_handlers()
     
     def setup_handlers(self):
         """Setup command handlers"""
+        # Multi-source commands run with block=False so they don't hold one of
+        # the application's concurrent update slots while waiting on APIs;
+        # fanout_limit bounds them across all users instead
         handlers = [
             CommandHandler("start", self.start),
             CommandHandler("help", self.help_command),
@@ -91,20 +318,20 @@ class TradingBot:
             CommandHandler("watch", self.add_watchlist),
             CommandHandler("watchlist", self.view_watchlist),
             CommandHandler("alert", self.set_alert),
-            CommandHandler("scan", self.scan_tokens),
+            CommandHandler("scan", self.scan_tokens, block=False),
             CommandHandler("trending", self.birdeye_trending),
             CommandHandler("top", self.top_gainers),
-            CommandHandler("advanced_scan", self.advanced_scan),
-            CommandHandler("sentiment", self.sentiment_analysis),
-            CommandHandler("ai_analysis", self.ai_analysis),
+            CommandHandler("advanced_scan", self.advanced_scan, block=False),
+            CommandHandler("sentiment", self.sentiment_analysis, block=False),
+            CommandHandler("ai_analysis", self.ai_analysis, block=False),
             CommandHandler("pumpfun", self.pumpfun_scan),
             CommandHandler("bullx", self.bullx_scan),
             CommandHandler("forex", self.forex_rates),
             CommandHandler("forexpair", self.forex_pair),
             CommandHandler("birdeye", self.birdeye_search),
             CommandHandler("forex_pairs", self.major_forex_pairs),
-            CommandHandler("multiscan", self.multiscan),
-            CommandHandler("portfolio_optimizer", self.portfolio_optimizer),
+            CommandHandler("multiscan", self.multiscan, block=False),
+            CommandHandler("portfolio_optimizer", self.portfolio_optimizer, block=False),
             CommandHandler("copy_trading", self.copy_trading),
             CommandHandler("market_maker", self.market_maker),
             CommandHandler("defi_opportunities", self.defi_opportunities),
@@ -118,6 +345,17 @@ class TradingBot:
         
         for handler in handlers:
             self.app.add_handler(handler)
+        
+        # Inline menu buttons run the matching command handler
+        self.button_commands = {
+            "portfolio": self.portfolio,
+            "scan": self.scan_tokens,
+            "birdeye": self.birdeye_trending,
+            "trending": self.birdeye_trending,
+            "pumpfun": self.pumpfun_scan,
+            "top_gainers": self.top_gainers,
+            "forex": self.forex_rates
+        }
     
     async def enforce_rate_limit(self, api_name: str, limit: int = 10, period: int = 60):
         """Enforce rate limiting for APIs"""
@@ -128,25 +366,25 @@ class TradingBot:
         
         if self.api_rate_limits[api_name] >= limit:
             wait_time = period - (current_time - self.rate_limit_reset[api_name] + period)
-            logger.warning(f"Rate limited on {api_name}. Waiting {wait_time:.1f}s")
+            logger.warning("Rate limited on %s. Waiting %.1fs", api_name, wait_time)
             await asyncio.sleep(wait_time)
         
         self.api_rate_limits[api_name] += 1
     
+    @per_user_limit
     async def message_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle regular messages"""
         try:
             message = update.message.text
             
             # Check if message contains token symbols to look up
-            token_pattern = r'\$([a-zA-Z0-9]+)'
-            matches = re.findall(token_pattern, message)
+            matches = TOKEN_MENTION_RE.findall(message)
             
             if matches:
                 for token in matches[:3]:  # Limit to first 3 tokens
-                    await self.quick_token_lookup(update, token.upper())
+                    await self.quick_token_lookup(update, self.normalize_token(token))
         except Exception as e:
-            logger.error(f"Message handler error: {e}")
+            logger.error("Message handler error: %s", e)
             await update.message.reply_text("⚠️ Error processing message. Please try again.")
     
     async def quick_token_lookup(self, update: Update, token: str):
@@ -163,105 +401,24 @@ class TradingBot:
             else:
                 await update.message.reply_text(f"❌ Couldn't find price data for {token}")
         except Exception as e:
-            logger.error(f"Quick lookup error: {e}")
+            logger.error("Quick lookup error: %s", e)
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Start command"""
-        keyboard = [
-            [InlineKeyboardButton("📊 Portfolio", callback_data="portfolio"),
-             InlineKeyboardButton("🔍 Scan Markets", callback_data="scan")],
-            [InlineKeyboardButton("🐦 BirdEye", callback_data="birdeye"),
-             InlineKeyboardButton("🔥 Trending", callback_data="trending")],
-            [InlineKeyboardButton("🚀 Pump.fun", callback_data="pumpfun"),
-             InlineKeyboardButton("📈 Top Gainers", callback_data="top_gainers")],
-            [InlineKeyboardButton("💱 Forex Rates", callback_data="forex"),
-             InlineKeyboardButton("🤖 AI Analysis", callback_data="ai_analysis")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        text = (
-            "🤖 *Advanced Trading Bot*\n\n"
-            "✅ Real-time Solana, Forex, and DeFi analytics\n\n"
-            "🔧 *Setup Guide:*\n"
-            "1. Use /register YOUR_WALLET_ADDRESS\n"
-            "2. Set API keys in environment:\n"
-            "   - BIRDEYE_API_KEY\n"
-            "   - APILAYER_API_KEY\n"
-            "   - COINGECKO_API_KEY\n\n"
-            "Choose an option or use /help for commands:"
-        )
-        
         await update.message.reply_text(
-            text,
+            START_TEXT,
             parse_mode='Markdown',
-            reply_markup=reply_markup
+            reply_markup=START_KEYBOARD
         )
     
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show help message with all commands"""
         try:
-            help_text = """
-🤖 *Trading Bot Commands*
-
-*Essential Setup*
-/register <wallet> - Link your Solana wallet
-/setup - API setup instructions
-
-*Account Management*
-/status - Account status
-/balance - Check SOL balance
-
-*Portfolio Management*
-/portfolio - Show holdings with real prices
-/watch <token> - Add to watchlist
-/watchlist - View watchlist with live prices
-/alert <token> <above|below> <price> - Set price alert
-/buy <token> <amount> - Simulate buy
-/sell <token> <amount> - Simulate sell
-
-*Market Analysis*
-/scan - Scan trending tokens
-/trending - BirdEye trending tokens
-/top - Top gainers
-/pumpfun - Pump.fun tokens
-/sentiment - Market sentiment
-/ai_analysis <token> - AI token analysis
-
-*Forex Tools*
-/forex - Major forex rates
-/forexpair <from> <to> - Forex pair rate
-/forex_pairs - Major forex pairs
-
-*Advanced Features*
-/advanced_scan - Deep market scan
-/multiscan - Multi-platform overview
-/portfolio_optimizer - Optimize portfolio
-/copy_trading - Copy top traders
-/market_maker - Market making ops
-/defi_opportunities - DeFi yields
-/whales - Whale transactions
-
-*Quick Lookup*
-Type $SYMBOL (e.g. $SOL) for quick price check
-
-*Troubleshooting*
-If commands don't respond:
-1. Check API keys with /setup
-2. Verify wallet with /register
-3. Use valid token symbols
-"""
-            # Split long message if needed
-            if len(help_text) > 4000:
-                part1 = help_text[:4000]
-                part2 = help_text[4000:]
-                await update.message.reply_text(part1, parse_mode='Markdown')
-                await update.message.reply_text(part2, parse_mode='Markdown')
-            else:
-                await update.message.reply_text(help_text, parse_mode='Markdown')
+            await update.message.reply_text(HELP_TEXT, parse_mode='Markdown')
         except Exception as e:
-            logger.error(f"Help command error: {e}")
+            logger.error("Help command error: %s", e)
             # Fallback without Markdown
-            await update.message.reply_text(help_text)
+            await update.message.reply_text(HELP_TEXT)
     
     async def setup(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Provide API setup instructions"""
@@ -307,26 +464,24 @@ If commands don't respond:
                 'watchlist': [],
                 'alerts': []
             }
-            await self.save_user_data()
+            await self.save_user_data(user_id)
             await update.message.reply_text("✅ Registration successful! Wallet linked.")
         else:
             self.users_data[user_id]['wallet'] = wallet_address
-            await self.save_user_data()
+            await self.save_user_data(user_id)
             await update.message.reply_text("🔁 Wallet updated successfully")
     
     def validate_solana_address(self, address: str) -> bool:
         """Validate Solana wallet address format"""
-        # Checking if it's a base58 string of the correct length
-        return bool(re.match(r'^[1-9A-HJ-NP-Za-km-z]{32,44}$', address))
+        return SOLANA_ADDRESS_RE.fullmatch(address) is not None
+    
+    def normalize_token(self, token: str) -> str:
+        """Upper-case token symbols; mint addresses are case-sensitive and kept as given"""
+        return token if self.validate_solana_address(token) else token.upper()
     
-    async def status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_registration
+    async def status(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         """Show account status"""
-        user_id = update.effective_user.id
-        
-        if user_id not in self.users_data:
-            await update.message.reply_text("Please /register first")
-            return
-        
         user_data = self.users_data[user_id]
         reg_date = datetime.fromisoformat(user_data['registered']).strftime('%Y-%m-%d')
         wallet_short = user_data['wallet'][:6] + "..." + user_data['wallet'][-4:]
@@ -348,91 +503,208 @@ If commands don't respond:
     # REAL-TIME DATA FUNCTIONS
     # ========================
     
+    async def get_with_retry(self, url: str, **kwargs) -> httpx.Response:
+        """GET url, backing off and retrying on rate limits, server errors and timeouts"""
+        for attempt in range(HTTP_RETRIES + 1):
+            try:
+                response = await self.client.get(url, **kwargs)
+            except httpx.TimeoutException:
+                if attempt == HTTP_RETRIES:
+                    raise
+                await asyncio.sleep(0.25 * 2 ** attempt)
+                continue
+            
+            if attempt == HTTP_RETRIES or (response.status_code != 429 and response.status_code < 500):
+                return response
+            
+            # Honor Retry-After when the API gives one in seconds
+            retry_after = response.headers.get('Retry-After', '')
+            delay = float(retry_after) if retry_after.isdigit() else 0.25 * 2 ** attempt
+            await asyncio.sleep(min(delay, HTTP_MAX_RETRY_DELAY))
+        return response
+
     async def get_cached_data(self, cache_key: str, fetch_func: Callable, ttl_seconds: int = 60) -> Any:
         """Get data from cache or fetch it if expired/missing"""
-        current_time = datetime.now()
-        
         # Check if data is in cache and not expired
-        if (cache_key in self.data_cache and 
-            cache_key in self.cache_expiry and 
-            current_time < self.cache_expiry[cache_key]):
-            return self.data_cache[cache_key]
-        
-        # Fetch fresh data
-        try:
-            data = await fetch_func()
-            if data:
-                self.data_cache[cache_key] = data
-                self.cache_expiry[cache_key] = current_time + timedelta(seconds=ttl_seconds)
+        data = self.get_fresh_data(cache_key)
+        if data is not None:
             return data
-        except Exception as e:
-            logger.error(f"Error fetching data for {cache_key}: {e}")
-            # Return cached data even if expired if fetch fails
+        
+        # Only one caller fetches a given key; the rest wait and reuse its result
+        async with self.cache_locks[cache_key]:
+            data = self.get_fresh_data(cache_key)
+            if data is not None:
+                return data
+            
+            # Fetch fresh data
+            try:
+                data = await fetch_func()
+                if data:
+                    self.set_cached_data(cache_key, data, ttl_seconds)
+                return data
+            except Exception as e:
+                logger.error("Error fetching data for %s: %s", cache_key, e)
+                # Return cached data even if expired if fetch fails
+                return self.data_cache.get(cache_key)
+    
+    def get_fresh_data(self, cache_key: str) -> Optional[Any]:
+        """Return cached data that hasn't expired yet, or None"""
+        if time.monotonic() < self.cache_expiry.get(cache_key, 0.0):
             return self.data_cache.get(cache_key)
+        return None
+    
+    def set_cached_data(self, cache_key: str, data: Any, ttl_seconds: int):
+        """Cache data for ttl_seconds"""
+        self.data_cache[cache_key] = data
+        self.cache_expiry[cache_key] = time.monotonic() + ttl_seconds
     
     async def get_real_time_price(self, token: str) -> Optional[float]:
         """Get real-time price with enhanced reliability"""
-        # First check real data sources
-        if token in self.real_data_sources:
-            return await self.real_data_sources[token]()
-        
-        # Enhanced fetching with multiple fallbacks
-        try:
-            await self.enforce_rate_limit('birdeye', 30, 60)
-            headers = {'X-API-KEY': self.api_keys['birdeye']}
-            url = f"{self.apis['birdeye']}/public/price"
-            params = {'address': token} if len(token) > 10 else {'symbol': token}
-            response = await self.client.get(url, headers=headers, params=params)
+        async def fetch_data():
+            # First check real data sources
+            if token in self.real_data_sources:
+                return await self.real_data_sources[token]()
             
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('success') and 'data' in data and 'value' in data['data']:
-                    return float(data['data']['value'])
-        except Exception as e:
-            logger.warning(f"Birdeye price error for {token}: {e}")
-        
-        # Fallback to CoinGecko
-        try:
-            await self.enforce_rate_limit('coingecko', 30, 60)
-            if self.api_keys['coingecko']:
-                headers = {'x-cg-pro-api-key': self.api_keys['coingecko']}
-                url = f"{self.apis['coingecko']}/simple/price"
-                params = {'ids': token.lower(), 'vs_currencies': 'usd'}
-                response = await self.client.get(url, headers=headers, params=params)
+            # Enhanced fetching with multiple fallbacks
+            try:
+                await self.enforce_rate_limit('birdeye', 30, 60)
+                headers = {'X-API-KEY': self.api_keys['birdeye']}
+                url = f"{self.apis['birdeye']}/public/price"
+                params = {'address': token} if len(token) > 10 else {'symbol': token}
+                response = await self.get_with_retry(url, headers=headers, params=params)
                 
                 if response.status_code == 200:
-                    data = response.json()
-                    if token.lower() in data and 'usd' in data[token.lower()]:
-                        return float(data[token.lower()]['usd'])
-        except Exception as e:
-            logger.warning(f"Coingecko price error for {token}: {e}")
+                    data = orjson.loads(response.content)
+                    if data.get('success') and 'data' in data and 'value' in data['data']:
+                        return float(data['data']['value'])
+            except Exception as e:
+                logger.warning("Birdeye price error for %s: %s", token, e)
+            
+            # Fallback to CoinGecko
+            try:
+                await self.enforce_rate_limit('coingecko', 30, 60)
+                if self.api_keys['coingecko']:
+                    headers = {'x-cg-pro-api-key': self.api_keys['coingecko']}
+                    url = f"{self.apis['coingecko']}/simple/price"
+                    params = {'ids': token.lower(), 'vs_currencies': 'usd'}
+                    response = await self.get_with_retry(url, headers=headers, params=params)
+                    
+                    if response.status_code == 200:
+                        data = orjson.loads(response.content)
+                        if token.lower() in data and 'usd' in data[token.lower()]:
+                            return float(data[token.lower()]['usd'])
+            except Exception as e:
+                logger.warning("Coingecko price error for %s: %s", token, e)
+            
+            # Fallback to DexScreener
+            try:
+                await self.enforce_rate_limit('dexscreener', 30, 60)
+                url = f"{self.apis['dexscreener']}/search?q={token}"
+                response = await self.get_with_retry(url)
+                
+                if response.status_code == 200:
+                    data = orjson.loads(response.content)
+                    if 'pairs' in data and len(data['pairs']) > 0:
+                        return float(data['pairs'][0]['priceUsd'])
+            except Exception as e:
+                logger.warning("DexScreener price error for %s: %s", token, e)
+            
+            return None
         
-        # Fallback to DexScreener
-        try:
+        # Prices are shared by every handler and the alert monitor
+        return await self.get_cached_data(f"price_{token}", fetch_data, ttl_seconds=PRICE_CACHE_TTL)
+
+    async def get_dexscreener_pairs(self, addresses: List[str]) -> Dict[str, Dict]:
+        """Get the most liquid DexScreener pair for each token address"""
+        async def fetch_chunk(chunk):
             await self.enforce_rate_limit('dexscreener', 30, 60)
-            url = f"{self.apis['dexscreener']}/search?q={token}"
-            response = await self.client.get(url)
-            
+            url = f"{self.apis['dexscreener']}/tokens/{','.join(chunk)}"
+            response = await self.get_with_retry(url)
             if response.status_code == 200:
-                data = response.json()
-                if 'pairs' in data and len(data['pairs']) > 0:
-                    return float(data['pairs'][0]['priceUsd'])
-        except Exception as e:
-            logger.warning(f"DexScreener price error for {token}: {e}")
+                return orjson.loads(response.content).get('pairs') or []
+            return []
         
-        return None
+        # The tokens endpoint accepts up to 30 comma-separated addresses
+        chunks = [addresses[i:i + 30] for i in range(0, len(addresses), 30)]
+        results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks), return_exceptions=True)
+        
+        pairs = {}
+        best_liquidity = {}
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("DexScreener bulk lookup error: %s", result)
+                continue
+            for pair in result:
+                address = (pair.get('baseToken') or {}).get('address')
+                liquidity = float((pair.get('liquidity') or {}).get('usd') or 0)
+                if address and (address not in pairs or liquidity > best_liquidity[address]):
+                    pairs[address] = pair
+                    best_liquidity[address] = liquidity
+        return pairs
+
+    async def get_prices(self, tokens) -> Dict[str, Optional[float]]:
+        """Get real-time prices for several tokens concurrently"""
+        unique_tokens = list(dict.fromkeys(tokens))
+        prices = {}
+        
+        # Resolve mint addresses in bulk, 30 per DexScreener request. Results
+        # share the price_{token} cache with get_real_time_price, and holding
+        # the keys' locks (in sorted order) makes concurrent lookups single-flight
+        addresses = sorted(token for token in unique_tokens if self.validate_solana_address(token))
+        if addresses:
+            async with contextlib.AsyncExitStack() as stack:
+                for address in addresses:
+                    await stack.enter_async_context(self.cache_locks[f"price_{address}"])
+                
+                missing = []
+                for address in addresses:
+                    price = self.get_fresh_data(f"price_{address}")
+                    if price is None:
+                        missing.append(address)
+                    else:
+                        prices[address] = price
+                
+                if missing:
+                    # Mints are case-sensitive; pairs where a requested mint is only
+                    # the quote side come back under another base address and are skipped
+                    for address, pair in (await self.get_dexscreener_pairs(missing)).items():
+                        price = float(pair.get('priceUsd') or 0)
+                        if address in missing and price:
+                            prices[address] = price
+                            self.set_cached_data(f"price_{address}", price, PRICE_CACHE_TTL)
+        
+        # Symbols, and addresses DexScreener doesn't know, use the fallback chain
+        semaphore = asyncio.Semaphore(10)
+        
+        async def fetch(token):
+            async with semaphore:
+                return await self.get_real_time_price(token)
+        
+        remaining = [token for token in unique_tokens if token not in prices]
+        results = await asyncio.gather(*(fetch(token) for token in remaining), return_exceptions=True)
+        
+        for token, result in zip(remaining, results):
+            if isinstance(result, Exception):
+                logger.warning("Price error for %s: %s", token, result)
+                result = None
+            prices[token] = result
+        return prices
+
+    async def get_stablecoin_price(self) -> float:
+        """USD stablecoins are pegged to 1.0"""
+        return 1.0
 
     async def get_solana_price(self) -> float:
         """Get SOL price from reliable source"""
         try:
             url = self.apis['dexscreener_solana']
-            response = await self.client.get(url)
+            response = await self.get_with_retry(url)
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 if 'pairs' in data and len(data['pairs']) > 0:
                     return float(data['pairs'][0]['priceUsd'])
         except Exception as e:
-            logger.error(f"SOL price error: {e}")
+            logger.error("SOL price error: %s", e)
         return 0.0
 
     async def get_ethereum_price(self) -> float:
@@ -442,13 +714,13 @@ If commands don't respond:
                 headers = {'x-cg-pro-api-key': self.api_keys['coingecko']}
                 url = f"{self.apis['coingecko']}/simple/price"
                 params = {'ids': 'ethereum', 'vs_currencies': 'usd'}
-                response = await self.client.get(url, headers=headers, params=params)
+                response = await self.get_with_retry(url, headers=headers, params=params)
                 
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     return float(data['ethereum']['usd'])
         except Exception as e:
-            logger.error(f"ETH price error: {e}")
+            logger.error("ETH price error: %s", e)
         return 0.0
 
     async def get_bitcoin_price(self) -> float:
@@ -458,13 +730,13 @@ If commands don't respond:
                 headers = {'x-cg-pro-api-key': self.api_keys['coingecko']}
                 url = f"{self.apis['coingecko']}/simple/price"
                 params = {'ids': 'bitcoin', 'vs_currencies': 'usd'}
-                response = await self.client.get(url, headers=headers, params=params)
+                response = await self.get_with_retry(url, headers=headers, params=params)
                 
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     return float(data['bitcoin']['usd'])
         except Exception as e:
-            logger.error(f"BTC price error: {e}")
+            logger.error("BTC price error: %s", e)
         return 0.0
 
     async def get_price_change(self, token: str) -> float:
@@ -475,10 +747,10 @@ If commands don't respond:
             headers = {'X-API-KEY': self.api_keys['birdeye']}
             url = f"{self.apis['birdeye']}/defi/token_overview"
             params = {'address': token} if len(token) > 10 else {'token_address': token}
-            response = await self.client.get(url, headers=headers, params=params)
+            response = await self.get_with_retry(url, headers=headers, params=params)
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 if data.get('success'):
                     return float(data['data']['priceChange24h'])
                     
@@ -488,89 +760,113 @@ If commands don't respond:
                 headers = {'x-cg-pro-api-key': self.api_keys['coingecko']}
                 url = f"{self.apis['coingecko']}/coins/{token.lower()}/market_chart"
                 params = {'vs_currency': 'usd', 'days': '1'}
-                response = await self.client.get(url, headers=headers, params=params)
+                response = await self.get_with_retry(url, headers=headers, params=params)
                 
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     if 'prices' in data and len(data['prices']) >= 2:
                         old_price = data['prices'][0][1]
                         new_price = data['prices'][-1][1]
                         return ((new_price - old_price) / old_price) * 100
                         
         except Exception as e:
-            logger.error(f"Price change error for {token}: {e}")
+            logger.error("Price change error for %s: %s", token, e)
             
         return 0.0
 
+    async def get_price_changes(self, tokens) -> Dict[str, float]:
+        """Get 24h price changes for several tokens concurrently"""
+        unique_tokens = list(dict.fromkeys(tokens))
+        semaphore = asyncio.Semaphore(10)
+        
+        async def fetch(token):
+            async with semaphore:
+                return await self.get_price_change(token)
+        
+        results = await asyncio.gather(*(fetch(token) for token in unique_tokens))
+        return dict(zip(unique_tokens, results))
+
+    async def post_rpc(self, payload: Any) -> Any:
+        """POST a JSON-RPC payload to the Solana RPC endpoint and decode the reply"""
+        response = await self.client.post(
+            self.apis['solana_rpc'],
+            content=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=15
+        )
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    async def rpc_call(self, method: str, params: list) -> Optional[Any]:
+        """Send a single Solana JSON-RPC call"""
+        item = await self.post_rpc({"jsonrpc": "2.0", "id": 0, "method": method, "params": params})
+        if 'result' in item:
+            return item['result']
+        logger.warning("RPC %s error: %s", method, item.get('error'))
+        return None
+
     async def get_sol_balance(self, wallet_address: str) -> float:
         """Get SOL balance using Solana RPC"""
-        try:
-            url = self.apis['solana_rpc']
-            headers = {"Content-Type": "application/json"}
-            payload = {
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "getBalance",
-                "params": [wallet_address]
-            }
-            
-            response = await self.client.post(url, json=payload, headers=headers, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                if 'result' in data and 'value' in data['result']:
-                    balance = data['result']['value']
-                    return balance / 10**9  # Convert lamports to SOL
-        except Exception as e:
-            logger.error(f"Balance check error: {e}")
-        return 0.0
+        async def fetch_data():
+            try:
+                return await self.queue_balance_lookup(wallet_address)
+            except Exception as e:
+                logger.error("Balance check error: %s", e)
+            return None
+        
+        # /balance and /portfolio are often run back to back for the same wallet
+        balance = await self.get_cached_data(f"sol_balance_{wallet_address}", fetch_data, ttl_seconds=30)
+        return balance or 0.0
 
-    async def get_token_balance(self, wallet_address: str, token_mint: str) -> float:
-        """Get token balance for a specific SPL token"""
-        try:
-            url = self.apis['solana_rpc']
-            headers = {"Content-Type": "application/json"}
-            
-            # First find token accounts
-            payload = {
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "getTokenAccountsByOwner",
-                "params": [
-                    wallet_address,
-                    {"mint": token_mint},
-                    {"encoding": "jsonParsed"}
-                ]
-            }
-            
-            response = await self.client.post(url, json=payload, headers=headers, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                if 'result' in data and 'value' in data['result']:
-                    accounts = data['result']['value']
-                    total_balance = 0
-                    
-                    for account in accounts:
-                        info = account.get('account', {}).get('data', {}).get('parsed', {}).get('info', {})
-                        if 'tokenAmount' in info:
-                            amount = info['tokenAmount'].get('uiAmount', 0)
-                            total_balance += amount
-                    
-                    return total_balance
-        except Exception as e:
-            logger.error(f"Token balance error: {e}")
-        return 0.0
+    async def queue_balance_lookup(self, wallet_address: str) -> Optional[float]:
+        """Wait for wallet_address's SOL balance from the next batched lookup"""
+        if wallet_address not in self.balance_waiters:
+            self.balance_waiters[wallet_address] = asyncio.get_running_loop().create_future()
+            if self.balance_flush is None:
+                self.balance_flush = asyncio.create_task(self.flush_balance_lookups())
+        return await asyncio.shield(self.balance_waiters[wallet_address])
+
+    async def flush_balance_lookups(self):
+        """Resolve all queued balance lookups with getMultipleAccounts calls"""
+        # Give concurrent /balance and /portfolio requests a moment to pile up
+        await asyncio.sleep(BALANCE_BATCH_WINDOW)
+        pending, self.balance_waiters = self.balance_waiters, {}
+        self.balance_flush = None
+        
+        async def fetch_chunk(wallets):
+            try:
+                # A zero-length data slice returns just the lamports
+                result = await self.rpc_call("getMultipleAccounts", [
+                    wallets, {"encoding": "base64", "dataSlice": {"offset": 0, "length": 0}}
+                ])
+                if result is None:
+                    balances = [None] * len(wallets)
+                else:
+                    # Unfunded accounts come back as null
+                    balances = [account['lamports'] / 10**9 if account else 0.0 for account in result['value']]
+                for wallet, balance in zip(wallets, balances):
+                    pending[wallet].set_result(balance)
+            except Exception as e:
+                for wallet in wallets:
+                    pending[wallet].set_exception(e)
+        
+        wallets = list(pending)
+        await asyncio.gather(*(
+            fetch_chunk(wallets[i:i + BALANCE_BATCH_SIZE])
+            for i in range(0, len(wallets), BALANCE_BATCH_SIZE)
+        ))
 
     async def get_pumpfun_tokens(self) -> List[Dict]:
         """Get real-time trending Pump.fun tokens"""
         async def fetch_data():
             try:
                 url = f"{self.apis['pumpfun']}/trending"
-                response = await self.client.get(url, timeout=10)
+                response = await self.get_with_retry(url, timeout=10)
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     return data.get('tokens', [])[:10]  # Return top 10
             except Exception as e:
-                logger.error(f"Pumpfun fetch error: {e}")
+                logger.error("Pumpfun fetch error: %s", e)
             return []
             
         return await self.get_cached_data("pumpfun_trending", fetch_data, ttl_seconds=300)
@@ -582,13 +878,13 @@ If commands don't respond:
                 headers = {'X-API-KEY': self.api_keys['birdeye']}
                 url = f"{self.apis['birdeye']}/defi/trending"
                 params = {'limit': limit, 'time_range': '1h'}
-                response = await self.client.get(url, headers=headers, params=params, timeout=10)
+                response = await self.get_with_retry(url, headers=headers, params=params, timeout=10)
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     if data.get('success'):
                         return data['data']
             except Exception as e:
-                logger.error(f"Birdeye trending error: {e}")
+                logger.error("Birdeye trending error: %s", e)
             return []
             
         return await self.get_cached_data("birdeye_trending", fetch_data, ttl_seconds=300)
@@ -620,13 +916,13 @@ If commands don't respond:
                 headers = {'apikey': self.api_keys['apilayer']}
                 url = f"{self.apis['apilayer_forex']}/latest"
                 params = {'base': base}
-                response = await self.client.get(url, headers=headers, params=params, timeout=10)
+                response = await self.get_with_retry(url, headers=headers, params=params, timeout=10)
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     if data.get('success'):
                         return data
             except Exception as e:
-                logger.error(f"Forex fetch error: {e}")
+                logger.error("Forex fetch error: %s", e)
             return None
             
         return await self.get_cached_data(f"forex_{base}", fetch_data, ttl_seconds=3600)
@@ -638,13 +934,13 @@ If commands don't respond:
                 headers = {'X-API-KEY': self.api_keys['birdeye']}
                 url = f"{self.apis['birdeye']}/defi/transactions"
                 params = {'type': 'large', 'limit': 10}
-                response = await self.client.get(url, headers=headers, params=params, timeout=15)
+                response = await self.get_with_retry(url, headers=headers, params=params, timeout=15)
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     if data.get('success') and 'data' in data and 'items' in data['data']:
                         return data['data']['items'][:5]
             except Exception as e:
-                logger.error(f"Whale transactions error: {e}")
+                logger.error("Whale transactions error: %s", e)
             return []
             
         return await self.get_cached_data("whale_transactions", fetch_data, ttl_seconds=300)
@@ -656,13 +952,13 @@ If commands don't respond:
                 headers = {'X-API-KEY': self.api_keys['birdeye']}
                 url = f"{self.apis['birdeye']}/defi/top_gainers"
                 params = {'limit': limit, 'time_range': '1h'}
-                response = await self.client.get(url, headers=headers, params=params, timeout=10)
+                response = await self.get_with_retry(url, headers=headers, params=params, timeout=10)
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     if data.get('success'):
                         return data['data']
             except Exception as e:
-                logger.error(f"Top gainers fetch error: {e}")
+                logger.error("Top gainers fetch error: %s", e)
             return []
             
         return await self.get_cached_data("top_gainers", fetch_data, ttl_seconds=300)
@@ -672,12 +968,12 @@ If commands don't respond:
         async def fetch_data():
             try:
                 url = f"{self.apis['dexscreener']}/tokens/new"
-                response = await self.client.get(url, timeout=10)
+                response = await self.get_with_retry(url, timeout=10)
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     return data.get('pairs', [])[:10]
             except Exception as e:
-                logger.error(f"BullX tokens error: {e}")
+                logger.error("BullX tokens error: %s", e)
             return []
             
         return await self.get_cached_data("bullx_tokens", fetch_data, ttl_seconds=300)
@@ -689,13 +985,13 @@ If commands don't respond:
                 headers = {'X-API-KEY': self.api_keys['birdeye']}
                 url = f"{self.apis['birdeye']}/defi/token_overview"
                 params = {'address': token} if len(token) > 10 else {'token_address': token}
-                response = await self.client.get(url, headers=headers, timeout=10)
+                response = await self.get_with_retry(url, headers=headers, timeout=10)
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     if data.get('success'):
                         return data['data']
             except Exception as e:
-                logger.error(f"Token metadata error: {e}")
+                logger.error("Token metadata error: %s", e)
             return {}
             
         return await self.get_cached_data(f"token_metadata_{token}", fetch_data, ttl_seconds=300)
@@ -704,23 +1000,21 @@ If commands don't respond:
     # USER COMMANDS
     # ======================
     
-    async def balance(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_registration
+    @per_user_limit
+    async def balance(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         """Get SOL balance of registered wallet"""
-        user_id = update.effective_user.id
-        
-        if user_id not in self.users_data:
-            await update.message.reply_text("Please /register first")
-            return
-        
         wallet_address = self.users_data[user_id]['wallet']
         
         # Show loading message
         status_message = await update.message.reply_text("⏳ Fetching balance...")
         
         try:
-            sol_balance = await self.get_sol_balance(wallet_address)
-            sol_price = await self.get_real_time_price('SOL') or 0
-            usd_value = sol_balance * sol_price
+            sol_balance, sol_price = await asyncio.gather(
+                self.get_sol_balance(wallet_address),
+                self.get_real_time_price('SOL')
+            )
+            usd_value = sol_balance * (sol_price or 0)
             
             await status_message.edit_text(
                 f"💰 *Wallet Balance*\n\n"
@@ -731,71 +1025,68 @@ If commands don't respond:
                 parse_mode='Markdown'
             )
         except Exception as e:
-            logger.error(f"Balance fetch error: {e}")
+            logger.error("Balance fetch error: %s", e)
             await status_message.edit_text("⚠️ Error fetching wallet balance. Please try again later.")
 
-    async def portfolio(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_registration
+    @per_user_limit
+    async def portfolio(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         """Show portfolio with real-time values"""
-        user_id = update.effective_user.id
-        
-        if user_id not in self.users_data:
-            await update.message.reply_text("Please /register first")
-            return
-        
         # Show loading message
-        status_message = await update.message.reply_text("⏳ Loading portfolio...")
+        status_message = await update.effective_message.reply_text("⏳ Loading portfolio...")
         
         try:
             wallet_address = self.users_data[user_id]['wallet']
             
-            # Get SOL balance
-            sol_balance = await self.get_sol_balance(wallet_address)
-            
             # For a real portfolio, we'd fetch actual SPL tokens
             # For this demo, we'll use a simulated portfolio
             portfolio = {
-                'SOL': {'amount': sol_balance},
+                'SOL': {'amount': 0.0},
                 'USDC': {'amount': 500},
                 'BONK': {'amount': 100000}
             }
             
+            # The SOL balance RPC doesn't depend on the market lookups
+            sol_balance, prices, changes = await asyncio.gather(
+                self.get_sol_balance(wallet_address),
+                self.get_prices(portfolio),
+                self.get_price_changes(portfolio)
+            )
+            portfolio['SOL']['amount'] = sol_balance
+            
             total_value = 0
-            message = "📊 *Portfolio Overview*\n\n"
+            parts = ["📊 *Portfolio Overview*\n\n"]
             
             for token, data in portfolio.items():
-                price = await self.get_real_time_price(token) or 0
+                price = prices.get(token) or 0
                 value = data['amount'] * price
                 total_value += value
                 
-                change = await self.get_price_change(token)
+                change = changes[token]
                 change_emoji = "📈" if change >= 0 else "📉"
                 
-                message += (
+                parts.append(
                     f"*{token}*: {data['amount']:,.2f}\n"
                     f"Price: ${price:,.6f} {change_emoji} {change:.1f}%\n"
                     f"Value: ${value:,.2f}\n\n"
                 )
             
-            message += f"💎 *Total Value*: ${total_value:,.2f}"
-            await status_message.edit_text(message, parse_mode='Markdown')
+            parts.append(f"💎 *Total Value*: ${total_value:,.2f}")
+            await status_message.edit_text("".join(parts), parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Portfolio error: {e}")
+            logger.error("Portfolio error: %s", e)
             await status_message.edit_text("⚠️ Error loading portfolio. Please try again later.")
 
-    async def add_watchlist(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_registration
+    @per_user_limit
+    async def add_watchlist(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         """Add token to watchlist"""
-        user_id = update.effective_user.id
-        
         if not context.args:
             await update.message.reply_text("Usage: /watch <token_symbol>")
             return
             
-        token = context.args[0].upper()
-        
-        if user_id not in self.users_data:
-            await update.message.reply_text("Please /register first")
-            return
+        token = self.normalize_token(context.args[0])
         
         # Verify token exists
         price = await self.get_real_time_price(token)
@@ -805,19 +1096,15 @@ If commands don't respond:
         
         if token not in self.users_data[user_id]['watchlist']:
             self.users_data[user_id]['watchlist'].append(token)
-            await self.save_user_data()
+            await self.save_user_data(user_id)
             await update.message.reply_text(f"✅ Added {token} to your watchlist")
         else:
             await update.message.reply_text(f"{token} is already in your watchlist")
 
-    async def view_watchlist(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_registration
+    @per_user_limit
+    async def view_watchlist(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         """View tokens in watchlist with prices"""
-        user_id = update.effective_user.id
-        
-        if user_id not in self.users_data:
-            await update.message.reply_text("Please /register first")
-            return
-        
         watchlist = self.users_data[user_id]['watchlist']
         if not watchlist:
             await update.message.reply_text("Your watchlist is empty. Use /watch to add tokens.")
@@ -827,33 +1114,37 @@ If commands don't respond:
         status_message = await update.message.reply_text("⏳ Loading watchlist data...")
         
         try:
-            message = "👀 *Your Watchlist*\n\n"
+            parts = ["👀 *Your Watchlist*\n\n"]
+            prices, changes = await asyncio.gather(
+                self.get_prices(watchlist),
+                self.get_price_changes(watchlist)
+            )
             for token in watchlist:
-                price = await self.get_real_time_price(token)
-                change = await self.get_price_change(token)
+                price = prices.get(token)
+                change = changes[token]
                 
                 if price:
                     change_emoji = "📈" if change >= 0 else "📉"
-                    message += f"• *{token}*: ${price:.6f} {change_emoji} {change:.2f}%\n"
+                    parts.append(f"• *{token}*: ${price:.6f} {change_emoji} {change:.2f}%\n")
                 else:
-                    message += f"• *{token}*: Price unavailable\n"
+                    parts.append(f"• *{token}*: Price unavailable\n")
             
-            message += f"\n_Updated: {datetime.now().strftime('%H:%M:%S')}_"
-            await status_message.edit_text(message, parse_mode='Markdown')
+            parts.append(f"\n_Updated: {datetime.now().strftime('%H:%M:%S')}_")
+            await status_message.edit_text("".join(parts), parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Watchlist error: {e}")
+            logger.error("Watchlist error: %s", e)
             await status_message.edit_text("⚠️ Error loading watchlist. Please try again later.")
 
-    async def set_alert(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_registration
+    @per_user_limit
+    async def set_alert(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         """Set price alert for a token"""
-        user_id = update.effective_user.id
-        
         if len(context.args) < 3:
             await update.message.reply_text("Usage: /alert <token> <direction> <price>\nExample: /alert SOL above 150.50")
             return
         
-        token = context.args[0].upper()
+        token = self.normalize_token(context.args[0])
         direction = context.args[1].lower()
         try:
             price = float(context.args[2])
@@ -865,10 +1156,6 @@ If commands don't respond:
             await update.message.reply_text("Direction must be 'above' or 'below'")
             return
         
-        if user_id not in self.users_data:
-            await update.message.reply_text("Please /register first")
-            return
-        
         # Verify token exists
         current_price = await self.get_real_time_price(token)
         if not current_price:
@@ -890,7 +1177,8 @@ If commands don't respond:
             'price': price,
             'created_at': datetime.now().isoformat()
         })
-        await self.save_user_data()
+        self.alert_index[token].add(user_id)
+        await self.save_user_data(user_id)
         
         await update.message.reply_text(
             f"🔔 Price alert set for {token}!\n"
@@ -898,10 +1186,12 @@ If commands don't respond:
             f"Current price: ${current_price:.4f}"
         )
 
+    @per_user_limit
+    @fanout_limit
     async def scan_tokens(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Scan trending tokens from DexScreener"""
         # Show loading message
-        status_message = await update.message.reply_text("⏳ Scanning tokens...")
+        status_message = await update.effective_message.reply_text("⏳ Scanning tokens...")
         
         try:
             tokens = await self.get_bullx_tokens()
@@ -909,31 +1199,31 @@ If commands don't respond:
                 await status_message.edit_text("⚠️ Couldn't fetch token data")
                 return
             
-            message = "🔍 *Newly Listed Tokens*\n\n"
+            parts = ["🔍 *Newly Listed Tokens*\n\n"]
             for i, token in enumerate(tokens[:8], 1):
-                name = token.get('baseToken', {}).get('name', 'Unknown')[:15]
-                symbol = token.get('baseToken', {}).get('symbol', 'TOKEN')
+                base = token.get('baseToken') or {}
+                name = base.get('name', 'Unknown')[:15]
+                symbol = base.get('symbol', 'TOKEN')
                 price = float(token.get('priceUsd', 0))
-                change = float(token.get('priceChange', {}).get('h24', 0) or 0)
-                volume = float(token.get('volume', {}).get('h24', 0) or 0)
+                change = float((token.get('priceChange') or {}).get('h24', 0) or 0)
+                volume = float((token.get('volume') or {}).get('h24', 0) or 0)
                 
-                message += (
-                    f"{i}. *{name} ({symbol})*\n"
-                    f"   💰 ${price:.6f} | 📈 {change:.1f}%\n"
-                    f"   💦 Vol: ${volume/1000:.1f}K\n\n"
-                )
+                parts.append(TOKEN_ROW_TEMPLATE.format(
+                    i=i, name=name, symbol=symbol, price=price, change=change, volume_k=volume / 1000
+                ))
             
-            message += f"_Updated: {datetime.now().strftime('%H:%M:%S')}_"
-            await status_message.edit_text(message, parse_mode='Markdown')
+            parts.append(f"_Updated: {datetime.now().strftime('%H:%M:%S')}_")
+            await status_message.edit_text("".join(parts), parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Token scan error: {e}")
+            logger.error("Token scan error: %s", e)
             await status_message.edit_text("⚠️ Error scanning tokens")
 
+    @per_user_limit
     async def birdeye_trending(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show trending tokens from Birdeye"""
         # Show loading message
-        status_message = await update.message.reply_text("⏳ Fetching trending tokens...")
+        status_message = await update.effective_message.reply_text("⏳ Fetching trending tokens...")
         
         try:
             tokens = await self.get_birdeye_trending(limit=8)
@@ -941,7 +1231,7 @@ If commands don't respond:
                 await status_message.edit_text("⚠️ Couldn't fetch trending data")
                 return
             
-            message = "🔥 *Trending Tokens (Birdeye)*\n\n"
+            parts = ["🔥 *Trending Tokens (Birdeye)*\n\n"]
             for i, token in enumerate(tokens, 1):
                 name = token.get('name', 'Unknown')[:15]
                 symbol = token.get('symbol', 'TOKEN')
@@ -949,23 +1239,22 @@ If commands don't respond:
                 change = float(token.get('priceChange24h', 0))
                 volume = float(token.get('volume24h', 0) or 0)
                 
-                message += (
-                    f"{i}. *{name} ({symbol})*\n"
-                    f"   💰 ${price:.6f} | 📈 {change:.1f}%\n"
-                    f"   💦 Vol: ${volume/1000:.1f}K\n\n"
-                )
+                parts.append(TOKEN_ROW_TEMPLATE.format(
+                    i=i, name=name, symbol=symbol, price=price, change=change, volume_k=volume / 1000
+                ))
             
-            message += f"_Updated: {datetime.now().strftime('%H:%M:%S')}_"
-            await status_message.edit_text(message, parse_mode='Markdown')
+            parts.append(f"_Updated: {datetime.now().strftime('%H:%M:%S')}_")
+            await status_message.edit_text("".join(parts), parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Birdeye trending error: {e}")
+            logger.error("Birdeye trending error: %s", e)
             await status_message.edit_text("⚠️ Error fetching trending tokens")
 
+    @per_user_limit
     async def top_gainers(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show top gainers"""
         # Show loading message
-        status_message = await update.message.reply_text("⏳ Fetching top gainers...")
+        status_message = await update.effective_message.reply_text("⏳ Fetching top gainers...")
         
         try:
             gainers = await self.get_top_gainers(limit=8)
@@ -973,25 +1262,26 @@ If commands don't respond:
                 await status_message.edit_text("⚠️ Couldn't fetch top gainers")
                 return
             
-            message = "🚀 *Top Gainers (Last 24h)*\n\n"
+            parts = ["🚀 *Top Gainers (Last 24h)*\n\n"]
             for i, token in enumerate(gainers, 1):
                 name = token.get('name', 'Unknown')[:15]
                 symbol = token.get('symbol', 'TOKEN')
                 price = float(token.get('price', 0))
                 change = float(token.get('priceChange24h', 0))
                 
-                message += (
-                    f"{i}. *{name} ({symbol})*\n"
-                    f"   💰 ${price:.6f} | 📈 {change:.1f}%\n\n"
-                )
+                parts.append(GAINER_ROW_TEMPLATE.format(
+                    i=i, name=name, symbol=symbol, price=price, change=change
+                ))
             
-            message += f"_Updated: {datetime.now().strftime('%H:%M:%S')}_"
-            await status_message.edit_text(message, parse_mode='Markdown')
+            parts.append(f"_Updated: {datetime.now().strftime('%H:%M:%S')}_")
+            await status_message.edit_text("".join(parts), parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Top gainers error: {e}")
+            logger.error("Top gainers error: %s", e)
             await status_message.edit_text("⚠️ Error fetching top gainers")
 
+    @per_user_limit
+    @fanout_limit
     async def advanced_scan(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Advanced token scan combining multiple sources"""
         # Show loading message
@@ -1012,53 +1302,56 @@ If commands don't respond:
                 await status_message.edit_text("⚠️ Couldn't fetch any token data")
                 return
                 
-            message = "🔬 *Advanced Token Scan*\n\n"
+            parts = ["🔬 *Advanced Token Scan*\n\n"]
             
             if birdeye_tokens:
-                message += "🐦 *Birdeye Top Tokens*\n"
+                parts.append("🐦 *Birdeye Top Tokens*\n")
                 for token in birdeye_tokens:
                     name = token.get('name', 'Unknown')[:15]
                     symbol = token.get('symbol', 'TOKEN')
                     price = float(token.get('price', 0))
                     change = float(token.get('priceChange24h', 0))
                     
-                    message += (
-                        f"• {name} ({symbol}): ${price:.6f} | {change:.1f}%\n"
-                    )
-                message += "\n"
+                    parts.append(SCAN_ROW_TEMPLATE.format(
+                        name=name, symbol=symbol, price=price, change=change
+                    ))
+                parts.append("\n")
             
             if dexscreener_tokens:
-                message += "📊 *DexScreener New Tokens*\n"
+                parts.append("📊 *DexScreener New Tokens*\n")
                 for token in dexscreener_tokens:
-                    name = token.get('baseToken', {}).get('name', 'Unknown')[:15]
-                    symbol = token.get('baseToken', {}).get('symbol', 'TOKEN')
+                    base = token.get('baseToken') or {}
+                    name = base.get('name', 'Unknown')[:15]
+                    symbol = base.get('symbol', 'TOKEN')
                     price = float(token.get('priceUsd', 0))
-                    change = float(token.get('priceChange', {}).get('h24', 0) or 0)
+                    change = float((token.get('priceChange') or {}).get('h24', 0) or 0)
                     
-                    message += (
-                        f"• {name} ({symbol}): ${price:.6f} | {change:.1f}%\n"
-                    )
-                message += "\n"
+                    parts.append(SCAN_ROW_TEMPLATE.format(
+                        name=name, symbol=symbol, price=price, change=change
+                    ))
+                parts.append("\n")
             
             if pumpfun_tokens:
-                message += "🚀 *Pump.fun Trending*\n"
+                parts.append("🚀 *Pump.fun Trending*\n")
                 for token in pumpfun_tokens:
                     name = token.get('name', 'Unknown')[:15]
                     symbol = token.get('symbol', 'TOKEN')
                     price = float(token.get('price', 0))
                     change = float(token.get('change_24h', 0) or 0)
                     
-                    message += (
-                        f"• {name} ({symbol}): ${price:.6f} | {change:.1f}%\n"
-                    )
+                    parts.append(SCAN_ROW_TEMPLATE.format(
+                        name=name, symbol=symbol, price=price, change=change
+                    ))
             
-            message += f"\n_Updated: {datetime.now().strftime('%H:%M:%S')}_"
-            await status_message.edit_text(message, parse_mode='Markdown')
+            parts.append(f"\n_Updated: {datetime.now().strftime('%H:%M:%S')}_")
+            await status_message.edit_text("".join(parts), parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Advanced scan error: {e}")
+            logger.error("Advanced scan error: %s", e)
             await status_message.edit_text("⚠️ Error performing advanced scan")
 
+    @per_user_limit
+    @fanout_limit
     async def sentiment_analysis(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Get market sentiment using Birdeye social data"""
         # Show loading message
@@ -1066,8 +1359,10 @@ If commands don't respond:
         
         try:
             # Get trending tokens from Birdeye
-            tokens = await self.get_birdeye_trending(limit=5)
-            gainers = await self.get_top_gainers(limit=5)
+            tokens, gainers = await asyncio.gather(
+                self.get_birdeye_trending(limit=5),
+                self.get_top_gainers(limit=5)
+            )
             
             if not (tokens or gainers):
                 await status_message.edit_text("⚠️ Couldn't fetch sentiment data")
@@ -1137,13 +1432,14 @@ If commands don't respond:
             await status_message.edit_text(message, parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Sentiment analysis error: {e}")
+            logger.error("Sentiment analysis error: %s", e)
             await status_message.edit_text("⚠️ Error analyzing market sentiment")
 
+    @per_user_limit
     async def pumpfun_scan(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Real-time Pump.fun token scanner"""
         # Show loading message
-        status_message = await update.message.reply_text("⏳ Scanning Pump.fun tokens...")
+        status_message = await update.effective_message.reply_text("⏳ Scanning Pump.fun tokens...")
         
         try:
             tokens = await self.get_pumpfun_tokens()
@@ -1151,7 +1447,7 @@ If commands don't respond:
                 await status_message.edit_text("⚠️ Couldn't fetch Pump.fun data")
                 return
             
-            message = "🔥 *Pump.fun Trending Tokens*\n\n"
+            parts = ["🔥 *Pump.fun Trending Tokens*\n\n"]
             for i, token in enumerate(tokens[:8], 1):
                 name = token.get('name', 'Unknown')
                 symbol = token.get('symbol', 'TOKEN')
@@ -1159,19 +1455,18 @@ If commands don't respond:
                 change = float(token.get('change_24h', 0) or 0)
                 volume = float(token.get('volume', 0) or 0)
                 
-                message += (
-                    f"{i}. *{name} ({symbol})*\n"
-                    f"   💰 ${price:.6f} | 📈 {change:.1f}%\n"
-                    f"   💦 Vol: ${volume/1000:.1f}K\n\n"
-                )
+                parts.append(TOKEN_ROW_TEMPLATE.format(
+                    i=i, name=name, symbol=symbol, price=price, change=change, volume_k=volume / 1000
+                ))
             
-            message += f"_Updated: {datetime.now().strftime('%H:%M:%S')}_"
-            await status_message.edit_text(message, parse_mode='Markdown')
+            parts.append(f"_Updated: {datetime.now().strftime('%H:%M:%S')}_")
+            await status_message.edit_text("".join(parts), parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Pumpfun scan error: {e}")
+            logger.error("Pumpfun scan error: %s", e)
             await status_message.edit_text("⚠️ Error scanning Pump.fun")
 
+    @per_user_limit
     async def bullx_scan(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """BullX token scanner (using DexScreener)"""
         # Show loading message
@@ -1183,31 +1478,31 @@ If commands don't respond:
                 await status_message.edit_text("⚠️ Couldn't fetch BullX data")
                 return
             
-            message = "🐂 *BullX Trending Tokens*\n\n"
+            parts = ["🐂 *BullX Trending Tokens*\n\n"]
             for i, token in enumerate(tokens[:8], 1):
-                name = token.get('baseToken', {}).get('name', 'Unknown')[:15]
-                symbol = token.get('baseToken', {}).get('symbol', 'TOKEN')
+                base = token.get('baseToken') or {}
+                name = base.get('name', 'Unknown')[:15]
+                symbol = base.get('symbol', 'TOKEN')
                 price = float(token.get('priceUsd', 0))
-                change = float(token.get('priceChange', {}).get('h24', 0) or 0)
-                volume = float(token.get('volume', {}).get('h24', 0) or 0)
+                change = float((token.get('priceChange') or {}).get('h24', 0) or 0)
+                volume = float((token.get('volume') or {}).get('h24', 0) or 0)
                 
-                message += (
-                    f"{i}. *{name} ({symbol})*\n"
-                    f"   💰 ${price:.6f} | 📈 {change:.1f}%\n"
-                    f"   💦 Vol: ${volume/1000:.1f}K\n\n"
-                )
+                parts.append(TOKEN_ROW_TEMPLATE.format(
+                    i=i, name=name, symbol=symbol, price=price, change=change, volume_k=volume / 1000
+                ))
             
-            message += f"_Updated: {datetime.now().strftime('%H:%M:%S')}_"
-            await status_message.edit_text(message, parse_mode='Markdown')
+            parts.append(f"_Updated: {datetime.now().strftime('%H:%M:%S')}_")
+            await status_message.edit_text("".join(parts), parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"BullX scan error: {e}")
+            logger.error("BullX scan error: %s", e)
             await status_message.edit_text("⚠️ Error scanning BullX tokens")
 
+    @per_user_limit
     async def forex_rates(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Real-time forex rates"""
         # Show loading message
-        status_message = await update.message.reply_text("⏳ Fetching forex rates...")
+        status_message = await update.effective_message.reply_text("⏳ Fetching forex rates...")
         
         try:
             data = await self.get_forex_rates()
@@ -1238,9 +1533,10 @@ If commands don't respond:
             await status_message.edit_text(message, parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Forex error: {e}")
+            logger.error("Forex error: %s", e)
             await status_message.edit_text("⚠️ Forex service unavailable")
 
+    @per_user_limit
     async def forex_pair(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Get specific forex pair rate"""
         if len(context.args) < 2:
@@ -1263,10 +1559,10 @@ If commands don't respond:
                     'to': to_curr,
                     'amount': 1
                 }
-                response = await self.client.get(url, headers=headers, params=params, timeout=10)
+                response = await self.get_with_retry(url, headers=headers, params=params, timeout=10)
                 
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
                     if data.get('success'):
                         rate = data['result']
                         message = (
@@ -1304,16 +1600,17 @@ If commands don't respond:
             await status_message.edit_text(f"⚠️ Couldn't get rate for {from_curr}/{to_curr}")
             
         except Exception as e:
-            logger.error(f"Forex pair error: {e}")
+            logger.error("Forex pair error: %s", e)
             await status_message.edit_text("⚠️ Forex service unavailable")
 
+    @per_user_limit
     async def birdeye_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Search for a token on Birdeye"""
         if not context.args:
             await update.message.reply_text("Usage: /birdeye <token_symbol>")
             return
             
-        token = context.args[0].upper()
+        token = self.normalize_token(context.args[0])
         
         # Show loading message
         status_message = await update.message.reply_text(f"🔍 Searching Birdeye for {token}...")
@@ -1322,10 +1619,10 @@ If commands don't respond:
             headers = {'X-API-KEY': self.api_keys['birdeye']}
             url = f"{self.apis['birdeye']}/defi/token_search"
             params = {'query': token}
-            response = await self.client.get(url, headers=headers, params=params, timeout=10)
+            response = await self.get_with_retry(url, headers=headers, params=params, timeout=10)
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 if data.get('success') and data.get('data'):
                     token_data = data['data'][0]
                     name = token_data.get('name', 'Unknown')
@@ -1362,9 +1659,10 @@ If commands don't respond:
             await status_message.edit_text(f"❌ Token {token} not found on Birdeye")
             
         except Exception as e:
-            logger.error(f"Birdeye search error: {e}")
+            logger.error("Birdeye search error: %s", e)
             await status_message.edit_text("⚠️ Search failed")
 
+    @per_user_limit
     async def major_forex_pairs(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show major forex pairs"""
         # Show loading message
@@ -1407,9 +1705,11 @@ If commands don't respond:
             await status_message.edit_text(message, parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Forex pairs error: {e}")
+            logger.error("Forex pairs error: %s", e)
             await status_message.edit_text("⚠️ Error fetching forex data")
 
+    @per_user_limit
+    @fanout_limit
     async def multiscan(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Multi-platform token scan"""
         # Show loading message
@@ -1432,73 +1732,72 @@ If commands don't respond:
                 await status_message.edit_text("⚠️ Couldn't fetch any token data")
                 return
                 
-            message = "🔍 *Multi-Platform Token Scan*\n\n"
+            parts = ["🔍 *Multi-Platform Token Scan*\n\n"]
             
             if birdeye_tokens:
-                message += "🐦 *Birdeye Trending*\n"
+                parts.append("🐦 *Birdeye Trending*\n")
                 for token in birdeye_tokens:
                     name = token.get('name', 'Unknown')[:15]
                     symbol = token.get('symbol', 'TOKEN')
                     price = float(token.get('price', 0))
                     change = float(token.get('priceChange24h', 0))
                     
-                    message += (
-                        f"• {name} ({symbol}): ${price:.6f} | {change:.1f}%\n"
-                    )
-                message += "\n"
+                    parts.append(SCAN_ROW_TEMPLATE.format(
+                        name=name, symbol=symbol, price=price, change=change
+                    ))
+                parts.append("\n")
             
             if dexscreener_tokens:
-                message += "📊 *DexScreener New*\n"
+                parts.append("📊 *DexScreener New*\n")
                 for token in dexscreener_tokens:
-                    name = token.get('baseToken', {}).get('name', 'Unknown')[:15]
-                    symbol = token.get('baseToken', {}).get('symbol', 'TOKEN')
+                    base = token.get('baseToken') or {}
+                    name = base.get('name', 'Unknown')[:15]
+                    symbol = base.get('symbol', 'TOKEN')
                     price = float(token.get('priceUsd', 0))
-                    change = float(token.get('priceChange', {}).get('h24', 0) or 0)
+                    change = float((token.get('priceChange') or {}).get('h24', 0) or 0)
                     
-                    message += (
-                        f"• {name} ({symbol}): ${price:.6f} | {change:.1f}%\n"
-                    )
-                message += "\n"
+                    parts.append(SCAN_ROW_TEMPLATE.format(
+                        name=name, symbol=symbol, price=price, change=change
+                    ))
+                parts.append("\n")
             
             if pumpfun_tokens:
-                message += "🚀 *Pump.fun Trending*\n"
+                parts.append("🚀 *Pump.fun Trending*\n")
                 for token in pumpfun_tokens:
                     name = token.get('name', 'Unknown')[:15]
                     symbol = token.get('symbol', 'TOKEN')
                     price = float(token.get('price', 0))
                     change = float(token.get('change_24h', 0) or 0)
                     
-                    message += (
-                        f"• {name} ({symbol}): ${price:.6f} | {change:.1f}%\n"
-                    )
-                message += "\n"
+                    parts.append(SCAN_ROW_TEMPLATE.format(
+                        name=name, symbol=symbol, price=price, change=change
+                    ))
+                parts.append("\n")
                 
             if gainers:
-                message += "📈 *Top Gainers*\n"
+                parts.append("📈 *Top Gainers*\n")
                 for token in gainers:
                     name = token.get('name', 'Unknown')[:15]
                     symbol = token.get('symbol', 'TOKEN')
                     price = float(token.get('price', 0))
                     change = float(token.get('priceChange24h', 0))
                     
-                    message += (
-                        f"• {name} ({symbol}): ${price:.6f} | {change:.1f}%\n"
-                    )
+                    parts.append(SCAN_ROW_TEMPLATE.format(
+                        name=name, symbol=symbol, price=price, change=change
+                    ))
             
-            message += f"\n_Updated: {datetime.now().strftime('%H:%M:%S')}_"
-            await status_message.edit_text(message, parse_mode='Markdown')
+            parts.append(f"\n_Updated: {datetime.now().strftime('%H:%M:%S')}_")
+            await status_message.edit_text("".join(parts), parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Multiscan error: {e}")
+            logger.error("Multiscan error: %s", e)
             await status_message.edit_text("⚠️ Error performing multiscan")
 
-    async def portfolio_optimizer(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_registration
+    @per_user_limit
+    @fanout_limit
+    async def portfolio_optimizer(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         """AI-powered portfolio optimization with real data"""
-        user_id = update.effective_user.id
-        if user_id not in self.users_data:
-            await update.message.reply_text("Please /register first")
-            return
-        
         # Show loading message
         status_message = await update.message.reply_text("⏳ Optimizing portfolio...")
         
@@ -1514,14 +1813,17 @@ If commands don't respond:
             total_value = 0
             assets = []
             
-            # Get real-time prices
+            # Get real-time prices and price changes to determine momentum
+            prices, changes = await asyncio.gather(
+                self.get_prices(portfolio),
+                self.get_price_changes(portfolio)
+            )
+            
             for token, data in portfolio.items():
-                current_price = await self.get_real_time_price(token) or 0
+                current_price = prices.get(token) or 0
                 value = data['amount'] * current_price
                 total_value += value
-                
-                # Get price change to determine momentum
-                price_change = await self.get_price_change(token)
+                price_change = changes[token]
                 
                 assets.append({
                     'token': token,
@@ -1579,7 +1881,7 @@ If commands don't respond:
             await status_message.edit_text(message, parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Portfolio opt error: {e}")
+            logger.error("Portfolio opt error: %s", e)
             await status_message.edit_text("⚠️ Optimization failed")
 
     async def copy_trading(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1647,7 +1949,7 @@ If commands don't respond:
             await status_message.edit_text(message, parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Copy trading error: {e}")
+            logger.error("Copy trading error: %s", e)
             await status_message.edit_text("⚠️ Error fetching trader data")
 
     async def market_maker(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1730,7 +2032,7 @@ If commands don't respond:
             await status_message.edit_text(message, parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Market maker error: {e}")
+            logger.error("Market maker error: %s", e)
             await status_message.edit_text("⚠️ Error fetching market data")
 
     async def defi_opportunities(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1807,9 +2109,10 @@ If commands don't respond:
             await status_message.edit_text(message, parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"DeFi opportunities error: {e}")
+            logger.error("DeFi opportunities error: %s", e)
             await status_message.edit_text("⚠️ Error fetching yield data")
 
+    @per_user_limit
     async def whale_tracker(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Track whale transactions in real-time"""
         # Show loading message
@@ -1824,8 +2127,9 @@ If commands don't respond:
             message = "🐳 *Top Whale Transactions*\n\n"
             
             for i, tx in enumerate(transactions[:5], 1):
-                token = tx.get('token', {}).get('name', 'UNKNOWN')
-                symbol = tx.get('token', {}).get('symbol', 'UNKNOWN')
+                tx_token = tx.get('token') or {}
+                token = tx_token.get('name', 'UNKNOWN')
+                symbol = tx_token.get('symbol', 'UNKNOWN')
                 amount = float(tx.get('amount', 0))
                 usd_value = float(tx.get('value', 0))
                 direction = "🟢 BUY" if tx.get('transactionType') == 'buy' else "🔴 SELL"
@@ -1842,16 +2146,18 @@ If commands don't respond:
             await status_message.edit_text(message, parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"Whale tracker error: {e}")
+            logger.error("Whale tracker error: %s", e)
             await status_message.edit_text("⚠️ Error tracking whales")
 
+    @per_user_limit
+    @fanout_limit
     async def ai_analysis(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """AI-powered token analysis with real-time data"""
         if not context.args:
             await update.message.reply_text("Usage: /ai_analysis <token_symbol>")
             return
             
-        token = context.args[0].upper()
+        token = self.normalize_token(context.args[0])
         
         # Show loading message
         status_message = await update.message.reply_text(f"🤖 Analyzing {token} with real-time data...")
@@ -1974,181 +2280,265 @@ If commands don't respond:
             await status_message.edit_text(message, parse_mode='Markdown')
             
         except Exception as e:
-            logger.error(f"AI analysis error: {e}")
+            logger.error("AI analysis error: %s", e)
             await status_message.edit_text("⚠️ Analysis failed")
 
-    async def buy(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_registration
+    @per_user_limit
+    async def buy(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         """Simulate buy order with real prices"""
         if len(context.args) < 2:
             await update.message.reply_text("Usage: /buy <token> <amount>\nExample: /buy SOL 1.5")
             return
             
-        token = context.args[0].upper()
+        token = self.normalize_token(context.args[0])
         try:
             amount = float(context.args[1])
         except ValueError:
             await update.message.reply_text("Invalid amount. Please use a number.")
             return
         
-        user_id = update.effective_user.id
-        if user_id not in self.users_data:
-            await update.message.reply_text("Please /register first")
-            return
-        
-        # Get real-time price
-        price = await self.get_real_time_price(token)
-        if not price:
-            await update.message.reply_text(f"❌ Couldn't get price for {token}")
-            return
-        
-        # Update portfolio
-        if token not in self.users_data[user_id]['portfolio']:
-            self.users_data[user_id]['portfolio'][token] = {
-                'amount': 0.0,
-                'avg_price': 0.0,
-                'total_cost': 0.0
-            }
+        # Serialize portfolio updates for this user
+        async with self.user_locks[user_id]:
+            # Get real-time price
+            price = await self.get_real_time_price(token)
+            if not price:
+                await update.message.reply_text(f"❌ Couldn't get price for {token}")
+                return
             
-        portfolio = self.users_data[user_id]['portfolio'][token]
-        total_cost = amount * price
-        portfolio['amount'] += amount
-        portfolio['total_cost'] += total_cost
-        portfolio['avg_price'] = portfolio['total_cost'] / portfolio['amount']
-        
-        await self.save_user_data()
-        
-        await update.message.reply_text(
-            f"✅ Simulated BUY order executed\n"
-            f"• Token: {token}\n"
-            f"• Amount: {amount:.4f}\n"
-            f"• Price: ${price:.6f}\n"
-            f"• Total: ${total_cost:.2f}\n\n"
-            f"New balance: {portfolio['amount']:.4f} {token}"
-        )
+            # Update portfolio
+            if token not in self.users_data[user_id]['portfolio']:
+                self.users_data[user_id]['portfolio'][token] = {
+                    'amount': 0.0,
+                    'avg_price': 0.0,
+                    'total_cost': 0.0
+                }
+            
+            portfolio = self.users_data[user_id]['portfolio'][token]
+            total_cost = amount * price
+            portfolio['amount'] += amount
+            portfolio['total_cost'] += total_cost
+            portfolio['avg_price'] = portfolio['total_cost'] / portfolio['amount']
+            
+            await self.save_user_data(user_id)
+            
+            await update.message.reply_text(
+                f"✅ Simulated BUY order executed\n"
+                f"• Token: {token}\n"
+                f"• Amount: {amount:.4f}\n"
+                f"• Price: ${price:.6f}\n"
+                f"• Total: ${total_cost:.2f}\n\n"
+                f"New balance: {portfolio['amount']:.4f} {token}"
+            )
 
-    async def sell(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+    @require_registration
+    @per_user_limit
+    async def sell(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
         """Simulate sell order with real prices"""
         if len(context.args) < 2:
             await update.message.reply_text("Usage: /sell <token> <amount>\nExample: /sell SOL 1.5")
             return
             
-        token = context.args[0].upper()
+        token = self.normalize_token(context.args[0])
         try:
             amount = float(context.args[1])
         except ValueError:
             await update.message.reply_text("Invalid amount. Please use a number.")
             return
         
-        user_id = update.effective_user.id
-        if user_id not in self.users_data:
-            await update.message.reply_text("Please /register first")
-            return
-        
-        # Check if token exists in portfolio
-        if token not in self.users_data[user_id]['portfolio']:
-            await update.message.reply_text(f"❌ You don't own any {token}")
-            return
+        # Hold the lock so a concurrent sell cannot spend the same balance
+        async with self.user_locks[user_id]:
+            # Check if token exists in portfolio
+            if token not in self.users_data[user_id]['portfolio']:
+                await update.message.reply_text(f"❌ You don't own any {token}")
+                return
+            
+            portfolio = self.users_data[user_id]['portfolio'][token]
+            
+            # Check if user has enough to sell
+            if amount > portfolio['amount']:
+                await update.message.reply_text(
+                    f"❌ Insufficient balance. You only have {portfolio['amount']:.4f} {token}"
+                )
+                return
+            
+            # Get real-time price
+            price = await self.get_real_time_price(token)
+            if not price:
+                await update.message.reply_text(f"❌ Couldn't get price for {token}")
+                return
+            
+            # Calculate sale value
+            sale_value = amount * price
+            
+            # Update portfolio
+            portfolio['amount'] -= amount
+            portfolio['total_cost'] -= amount * portfolio['avg_price']
+            
+            # If no more tokens, remove from portfolio
+            if portfolio['amount'] <= 0:
+                del self.users_data[user_id]['portfolio'][token]
+            else:
+                portfolio['avg_price'] = portfolio['total_cost'] / portfolio['amount']
+            
+            await self.save_user_data(user_id)
             
-        portfolio = self.users_data[user_id]['portfolio'][token]
-        
-        # Check if user has enough to sell
-        if amount > portfolio['amount']:
             await update.message.reply_text(
-                f"❌ Insufficient balance. You only have {portfolio['amount']:.4f} {token}"
+                f"✅ Simulated SELL order executed\n"
+                f"• Token: {token}\n"
+                f"• Amount: {amount:.4f}\n"
+                f"• Price: ${price:.6f}\n"
+                f"• Total: ${sale_value:.2f}\n\n"
+                f"New balance: {portfolio['amount']:.4f} {token}" if token in self.users_data[user_id]['portfolio'] else "Position closed"
             )
-            return
-        
-        # Get real-time price
-        price = await self.get_real_time_price(token)
-        if not price:
-            await update.message.reply_text(f"❌ Couldn't get price for {token}")
-            return
-        
-        # Calculate sale value
-        sale_value = amount * price
-        
-        # Update portfolio
-        portfolio['amount'] -= amount
-        portfolio['total_cost'] -= amount * portfolio['avg_price']
-        
-        # If no more tokens, remove from portfolio
-        if portfolio['amount'] <= 0:
-            del self.users_data[user_id]['portfolio'][token]
-        else:
-            portfolio['avg_price'] = portfolio['total_cost'] / portfolio['amount']
-        
-        await self.save_user_data()
-        
-        await update.message.reply_text(
-            f"✅ Simulated SELL order executed\n"
-            f"• Token: {token}\n"
-            f"• Amount: {amount:.4f}\n"
-            f"• Price: ${price:.6f}\n"
-            f"• Total: ${sale_value:.2f}\n\n"
-            f"New balance: {portfolio['amount']:.4f} {token}" if token in self.users_data[user_id]['portfolio'] else "Position closed"
-        )
 
     # ======================
     # UTILITIES & BACKGROUND
     # ======================
     
-    async def save_user_data(self):
-        """Save user data to JSON file"""
+    async def save_user_data(self, user_id: int):
+        """Queue a write of one user's record to disk"""
+        self.write_queue.put_nowait(user_id)
+
+    async def open_user_db(self):
+        """Open the user database, creating the schema if needed"""
+        self.db = await aiosqlite.connect(USER_DATA_DB)
+        # WAL lets readers proceed while the writer commits. NORMAL only fsyncs
+        # at checkpoints: a process crash loses nothing committed, but power loss
+        # or an OS crash can roll back commits made since the last checkpoint, on
+        # top of whatever is still waiting in the write-behind queue. The
+        # database itself is never corrupted; use FULL if that loss matters.
+        await self.db.execute("PRAGMA journal_mode=WAL")
+        await self.db.execute("PRAGMA synchronous=NORMAL")
+        await self.db.execute(
+            "CREATE TABLE IF NOT EXISTS users (user_id INTEGER PRIMARY KEY, data BLOB NOT NULL)"
+        )
+        await self.db.commit()
+
+    async def store_users(self, user_ids):
+        """Upsert the current records of user_ids in one transaction"""
+        rows = [
+            (user_id, orjson.dumps(self.users_data[user_id]))
+            for user_id in user_ids if user_id in self.users_data
+        ]
+        await self.db.executemany(
+            "INSERT INTO users (user_id, data) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data",
+            rows
+        )
+        await self.db.commit()
+
+    async def user_data_writer(self):
+        """Background task persisting queued user data writes"""
+        while True:
+            # Wait briefly after the first change, then drain the backlog so a
+            # burst of mutations becomes a single transaction
+            dirty = {await self.write_queue.get()}
+            await asyncio.sleep(USER_DATA_FLUSH_DELAY)
+            while not self.write_queue.empty():
+                dirty.add(self.write_queue.get_nowait())
+            
+            try:
+                await self.store_users(dirty)
+            except Exception as e:
+                logger.error("Save error: %s", e)
+                # Requeue the records so the next flush retries them
+                for user_id in dirty:
+                    self.write_queue.put_nowait(user_id)
+
+    async def load_user_data(self):
+        """Load all user records from the database"""
         try:
-            async with aiofiles.open('users.json', 'w') as f:
-                await f.write(json.dumps(self.users_data))
+            async with self.db.execute("SELECT user_id, data FROM users") as cursor:
+                rows = await cursor.fetchall()
+            self.users_data = {user_id: orjson.loads(data) for user_id, data in rows}
+            
+            # One-time import of the JSON file the database replaced
+            if not self.users_data and os.path.exists(USER_DATA_FILE):
+                loop = asyncio.get_running_loop()
+                self.users_data = await loop.run_in_executor(
+                    None, read_user_data, USER_DATA_FILE
+                )
+                await self.store_users(self.users_data)
+                logger.info("Imported %d users from %s", len(self.users_data), USER_DATA_FILE)
+            
+            self.index_alerts()
         except Exception as e:
-            logger.error(f"Save error: {e}")
+            logger.error("Load error: %s", e)
 
-    async def load_user_data(self):
-        """Load user data from file"""
+    async def send_price_alert(self, user_id: int, alert: Dict, current_price: float):
+        """Notify a user that their price alert triggered and retire it"""
+        token = alert['token']
+        message = (
+            f"🚨 *Price Alert!* {token}\n"
+            f"Current price: ${current_price:.6f}\n"
+            f"Target: {'above' if alert['direction'] == 'above' else 'below'} "
+            f"${alert['price']:.6f}"
+        )
+        
         try:
-            if os.path.exists('users.json'):
-                async with aiofiles.open('users.json', 'r') as f:
-                    self.users_data = json.loads(await f.read())
+            await self.app.bot.send_message(
+                chat_id=user_id,
+                text=message,
+                parse_mode='Markdown'
+            )
+            # Remove triggered alert
+            self.users_data[user_id]['alerts'].remove(alert)
+            self.unindex_alert(user_id, token)
+            await self.save_user_data(user_id)
         except Exception as e:
-            logger.error(f"Load error: {e}")
+            logger.error("Alert send error: %s", e)
 
     async def start_price_monitoring(self):
         """Background task for real-time price alerts"""
         while True:
             try:
-                for user_id, user_data in self.users_data.items():
-                    for alert in user_data.get('alerts', []):
-                        token = alert['token']
-                        target = alert['price']
-                        current_price = await self.get_real_time_price(token)
-                        
-                        if current_price:
+                # Look up each alerted token once, however many users watch it
+                prices = await self.get_prices(list(self.alert_index))
+                
+                triggered = []
+                for token, user_ids in self.alert_index.items():
+                    current_price = prices.get(token)
+                    if not current_price:
+                        continue
+                    
+                    for user_id in user_ids:
+                        for alert in self.users_data[user_id]['alerts']:
                             # Check if price crossed the alert threshold
-                            if ((alert['direction'] == 'above' and current_price >= target) or
-                                (alert['direction'] == 'below' and current_price <= target)):
-                                
-                                message = (
-                                    f"🚨 *Price Alert!* {token}\n"
-                                    f"Current price: ${current_price:.6f}\n"
-                                    f"Target: {'above' if alert['direction'] == 'above' else 'below'} "
-                                    f"${target:.6f}"
-                                )
-                                
-                                try:
-                                    await self.app.bot.send_message(
-                                        chat_id=user_id,
-                                        text=message,
-                                        parse_mode='Markdown'
-                                    )
-                                    # Remove triggered alert
-                                    user_data['alerts'].remove(alert)
-                                    await self.save_user_data()
-                                except Exception as e:
-                                    logger.error(f"Alert send error: {e}")
+                            if alert['token'] == token and (
+                                (alert['direction'] == 'above' and current_price >= alert['price']) or
+                                (alert['direction'] == 'below' and current_price <= alert['price'])):
+                                triggered.append((user_id, alert, current_price))
+                
+                # Send concurrently; the application's rate limiter paces delivery
+                await asyncio.gather(*(
+                    self.send_price_alert(user_id, alert, current_price)
+                    for user_id, alert, current_price in triggered
+                ))
                 
                 await asyncio.sleep(60)  # Check every minute
                 
             except Exception as e:
-                logger.error(f"Alert monitor error: {e}")
+                logger.error("Alert monitor error: %s", e)
                 await asyncio.sleep(30)
     
+    def index_alerts(self):
+        """Rebuild the token -> user ids index of active alerts"""
+        self.alert_index = defaultdict(set)
+        for user_id, user_data in self.users_data.items():
+            for alert in user_data.get('alerts', []):
+                self.alert_index[alert['token']].add(user_id)
+    
+    def unindex_alert(self, user_id: int, token: str):
+        """Drop a user from the alert index once they have no alerts left on token"""
+        if any(alert['token'] == token for alert in self.users_data[user_id]['alerts']):
+            return
+        user_ids = self.alert_index.get(token)
+        if user_ids is not None:
+            user_ids.discard(user_id)
+            if not user_ids:
+                del self.alert_index[token]
+    
     async def data_refresh_task(self):
         """Periodically refresh data"""
         while True:
@@ -2156,6 +2546,7 @@ If commands don't respond:
                 # Clear cache every 5 minutes
                 self.data_cache.clear()
                 self.cache_expiry.clear()
+                self.cache_locks.clear()
                 logger.info("Cache cleared")
                 
                 # Refresh token list
@@ -2164,82 +2555,31 @@ If commands don't respond:
                 
                 await asyncio.sleep(300)  # 5 minutes
             except Exception as e:
-                logger.error(f"Refresh task error: {e}")
+                logger.error("Refresh task error: %s", e)
                 await asyncio.sleep(60)
 
     async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle inline button presses"""
         query = update.callback_query
         await query.answer()
-        logger.info(f"Button pressed: {query.data} by {query.from_user.id}")
+        logger.info("Button pressed: %s by %s", query.data, query.from_user.id)
         
         try:
-            # Map button callbacks to actual commands
-            if query.data == "portfolio":
-                await self.portfolio(update, context)
-            elif query.data == "scan":
-                await self.scan_tokens(update, context)
-            elif query.data == "birdeye":
-                await self.birdeye_trending(update, context)
-            elif query.data == "trending":
-                await self.birdeye_trending(update, context)
-            elif query.data == "pumpfun":
-                await self.pumpfun_scan(update, context)
-            elif query.data == "top_gainers":
-                await self.top_gainers(update, context)
-            elif query.data == "forex":
-                await self.forex_rates(update, context)
+            # Commands reply via update.effective_message, which is the
+            # menu message for a button press
+            if query.data in self.button_commands:
+                await self.button_commands[query.data](update, context)
             elif query.data == "ai_analysis":
                 await query.message.reply_text("Send /ai_analysis <token> for detailed analysis")
             else:
                 await query.edit_message_text(text=f"Action '{query.data}' not implemented yet")
         except Exception as e:
-            logger.error(f"Button handler error: {e}")
-            await query.edit_message_text(text="⚠️ Error processing request")
-        
-        # Create a new update object for the command handlers
-        new_update = Update(
-            update_id=update.update_id,
-            message=query.message,
-            edited_message=None,
-            channel_post=None,
-            edited_channel_post=None,
-            inline_query=None,
-            chosen_inline_result=None,
-            callback_query=None,
-            shipping_query=None,
-            pre_checkout_query=None,
-            poll=None,
-            poll_answer=None,
-            my_chat_member=None,
-            chat_member=None,
-            chat_join_request=None
-        )
-        new_update.message.from_user = update.effective_user
-        
-        # Map button callbacks to actual commands
-        command_map = {
-            "portfolio": self.portfolio,
-            "scan": self.scan_tokens,
-            "birdeye": lambda u, c: self.birdeye_trending(u, c),
-            "trending": self.birdeye_trending,
-            "pumpfun": self.pumpfun_scan,
-            "top_gainers": self.top_gainers,
-            "forex": self.forex_rates,
-            "ai_analysis": lambda u, c: u.message.reply_text("Use /ai_analysis <token>")
-        }
-        
-        try:
-            if query.data in command_map:
-                await command_map[query.data](new_update, context)
-            else:
-                await query.edit_message_text(text=f"Action for '{query.data}' not implemented yet")
-        except Exception as e:
-            logger.error(f"Button handler error: {e}")
+            logger.error("Button handler error: %s", e)
             await query.edit_message_text(text="⚠️ Error processing request")
 
     async def run(self):
         """Start the bot"""
+        await self.open_user_db()
         await self.load_user_data()
         
         # Check API availability
@@ -2248,9 +2588,10 @@ If commands don't respond:
             status = "✅" if key else "❌"
             api_status.append(f"{api}: {status}")
         
-        logger.info("API Status:\n" + "\n".join(api_status))
+        logger.info("API Status:\n%s", "\n".join(api_status))
         
         # Start background tasks
+        asyncio.create_task(self.user_data_writer())
         asyncio.create_task(self.start_price_monitoring())
         asyncio.create_task(self.data_refresh_task())
         
@@ -2258,18 +2599,66 @@ If commands don't respond:
         await self.app.initialize()
         await self.app.start()
         logger.info("Bot started")
-        await self.app.updater.start_polling()
+        
+        # Webhook delivery in production; long polling is the dev fallback
+        webhook_url = os.getenv('WEBHOOK_URL')
+        if webhook_url:
+            await self.app.updater.start_webhook(
+                listen='0.0.0.0',
+                port=int(os.getenv('PORT', 8443)),
+                url_path=urlparse(webhook_url).path.lstrip('/'),
+                webhook_url=webhook_url,
+                secret_token=os.getenv('WEBHOOK_SECRET'),
+                allowed_updates=ALLOWED_UPDATES,
+                max_connections=100
+            )
+            logger.info("Receiving updates via webhook at %s", webhook_url)
+        else:
+            # Long poll so an idle bot issues one getUpdates every 30s
+            await self.app.updater.start_polling(
+                poll_interval=0.0,
+                timeout=30,
+                bootstrap_retries=-1,
+                allowed_updates=ALLOWED_UPDATES
+            )
         
         # Run until interrupted
-        await asyncio.Event().wait()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.app.updater.stop()
+            await self.app.stop()
+            await self.app.shutdown()
+            await self.client.aclose()
+            # Catch anything still waiting in the writer's flush window
+            await self.store_users(list(self.users_data))
+            await self.db.close()
 
 if __name__ == "__main__":
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    
     # Get Telegram token from environment variable
     BOT_TOKEN = os.environ.get("TELEGRAM_TOKEN")
     if not BOT_TOKEN:
         logging.error("TELEGRAM_TOKEN environment variable not set!")
         exit(1)
     
+    # Only one instance may poll the bot token; the OS drops the lock when
+    # the process dies, so a crash never leaves a stale lock behind
+    lock_file = open(LOCK_FILE, 'w')
+    try:
+        try:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:
+            # Windows has no flock; lock the file's first byte instead
+            import msvcrt
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        logging.error("Another bot instance is already running!")
+        exit(1)
+    
     # Add API key validation (FIXED INDENTATION BELOW)
     logger.info("Starting bot with configured API keys")
     if not os.getenv("BIRDEYE_API_KEY"):
@@ -2279,7 +2668,14 @@ if __name__ == "__main__":
     
     bot = TradingBot(BOT_TOKEN)
     
+    # uvloop's libuv event loop is faster for this all-network workload
+    try:
+        import uvloop
+        run_loop = uvloop.run
+    except ImportError:
+        run_loop = asyncio.run
+    
     try:
-        asyncio.run(bot.run())
+        run_loop(bot.run())
     except KeyboardInterrupt:
         logger.info("Bot stopped")
@@ -0,0 +1,26 @@
+import asyncio
+import importlib.util
+import os
+
+import pytest
+
+for dependency in ("dotenv", "httpx", "telegram", "aiosqlite", "orjson"):
+    pytest.importorskip(dependency)
+
+BOT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "47.py")
+
+
+@pytest.fixture(scope="session")
+def bot_module():
+    """47.py loaded as a module (its file name isn't a valid identifier)"""
+    spec = importlib.util.spec_from_file_location("vortext_bot", BOT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def bot(bot_module):
+    trading_bot = bot_module.TradingBot("123456:TEST")
+    yield trading_bot
+    asyncio.run(trading_bot.client.aclose())
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+
+def fake_rpc(bot, accounts=None, error=None):
+    """Replace bot.rpc_call; accounts maps wallet -> lamports (None for unfunded)"""
+    calls = []
+
+    async def rpc_call(method, params):
+        calls.append((method, params[0]))
+        if error:
+            raise error
+        if accounts is None:
+            return None
+        return {'value': [
+            None if accounts[wallet] is None else {'lamports': accounts[wallet]}
+            for wallet in params[0]
+        ]}
+
+    bot.rpc_call = rpc_call
+    return calls
+
+
+def test_concurrent_lookups_share_one_rpc_call(bot):
+    calls = fake_rpc(bot, {'a': 1_500_000_000, 'b': None, 'c': 2_000_000_000})
+
+    async def run():
+        return await asyncio.gather(*(bot.queue_balance_lookup(wallet) for wallet in 'abca'))
+
+    assert asyncio.run(run()) == [1.5, 0.0, 2.0, 1.5]
+    assert calls == [('getMultipleAccounts', ['a', 'b', 'c'])]
+    assert bot.balance_waiters == {}
+    assert bot.balance_flush is None
+
+
+def test_lookups_are_split_into_batches(bot, monkeypatch, bot_module):
+    monkeypatch.setattr(bot_module, 'BALANCE_BATCH_SIZE', 2)
+    calls = fake_rpc(bot, {'a': 0, 'b': 0, 'c': 0})
+
+    async def run():
+        return await asyncio.gather(*(bot.queue_balance_lookup(wallet) for wallet in 'abc'))
+
+    assert asyncio.run(run()) == [0.0, 0.0, 0.0]
+    assert [wallets for _, wallets in calls] == [['a', 'b'], ['c']]
+
+
+def test_rpc_error_result_resolves_to_none(bot):
+    fake_rpc(bot, accounts=None)
+
+    async def run():
+        return await asyncio.gather(bot.queue_balance_lookup('a'), bot.get_sol_balance('b'))
+
+    assert asyncio.run(run()) == [None, 0.0]
+
+
+def test_rpc_failure_reaches_every_waiter(bot):
+    fake_rpc(bot, error=RuntimeError("RPC down"))
+
+    async def run():
+        return await asyncio.gather(
+            bot.queue_balance_lookup('a'), bot.queue_balance_lookup('b'), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_get_sol_balance_falls_back_to_zero_on_failure(bot):
+    fake_rpc(bot, error=RuntimeError("RPC down"))
+    assert asyncio.run(bot.get_sol_balance('a')) == 0.0
+
+
+def test_cancelled_waiter_does_not_cancel_the_lookup(bot):
+    fake_rpc(bot, {'a': 1_000_000_000})
+
+    async def run():
+        first = asyncio.create_task(bot.queue_balance_lookup('a'))
+        second = asyncio.create_task(bot.queue_balance_lookup('a'))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == 1.0
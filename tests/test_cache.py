@@ -0,0 +1,63 @@
+import asyncio
+
+
+def test_concurrent_callers_share_one_fetch(bot):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'price': 1.5}
+
+    async def run():
+        return await asyncio.gather(*(bot.get_cached_data("price_SOL", fetch) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == [{'price': 1.5}] * 5
+
+
+def test_expired_entry_is_refetched(bot):
+    values = iter([1.0, 2.0])
+
+    async def fetch():
+        return next(values)
+
+    async def run():
+        first = await bot.get_cached_data("price_SOL", fetch, ttl_seconds=20)
+        cached = await bot.get_cached_data("price_SOL", fetch, ttl_seconds=20)
+        bot.cache_expiry["price_SOL"] = 0.0
+        refreshed = await bot.get_cached_data("price_SOL", fetch, ttl_seconds=20)
+        return first, cached, refreshed
+
+    assert asyncio.run(run()) == (1.0, 1.0, 2.0)
+
+
+def test_failed_fetch_returns_stale_data(bot):
+    async def fetch():
+        return 1.0
+
+    async def fail():
+        raise RuntimeError("API down")
+
+    async def run():
+        await bot.get_cached_data("price_SOL", fetch, ttl_seconds=20)
+        bot.cache_expiry["price_SOL"] = 0.0
+        return await bot.get_cached_data("price_SOL", fail, ttl_seconds=20)
+
+    assert asyncio.run(run()) == 1.0
+
+
+def test_empty_results_are_not_cached(bot):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return None
+
+    async def run():
+        await bot.get_cached_data("price_NOPE", fetch)
+        await bot.get_cached_data("price_NOPE", fetch)
+
+    asyncio.run(run())
+    assert len(calls) == 2
@@ -0,0 +1,162 @@
+import asyncio
+from types import SimpleNamespace
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+        self.edits = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+        return self
+
+    async def edit_text(self, text, **kwargs):
+        self.edits.append(text)
+
+
+class FakeQuery:
+    def __init__(self, data, user, message):
+        self.data = data
+        self.from_user = user
+        self.message = message
+        self.answered = False
+        self.edits = []
+
+    async def answer(self):
+        self.answered = True
+
+    async def edit_message_text(self, text, **kwargs):
+        self.edits.append(text)
+
+
+def command_update(user_id):
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), effective_message=FakeMessage())
+
+
+def button_update(user_id, data):
+    user = SimpleNamespace(id=user_id)
+    message = FakeMessage()
+    query = FakeQuery(data, user, message)
+    return SimpleNamespace(effective_user=user, effective_message=message, callback_query=query)
+
+
+def registered(bot, user_id):
+    bot.users_data[user_id] = {
+        'wallet': 'So11111111111111111111111111111111111111112',
+        'registered': '2024-01-01T00:00:00',
+        'watchlist': [],
+        'alerts': [],
+        'portfolio': {},
+    }
+
+
+def make_handler(bot_module, seen):
+    @bot_module.require_registration
+    @bot_module.per_user_limit
+    async def handler(self, update, context, user_id):
+        seen.append((user_id, update.effective_user.id in self.user_slots))
+        return "done"
+    return handler
+
+
+def test_unregistered_user_is_asked_to_register(bot, bot_module):
+    seen = []
+    update = command_update(7)
+
+    assert asyncio.run(make_handler(bot_module, seen)(bot, update, None)) is None
+    assert seen == []
+    assert update.effective_message.replies == ["Please /register first"]
+    assert bot.user_slots == {}
+
+
+def test_registered_user_id_reaches_the_handler(bot, bot_module):
+    seen = []
+    registered(bot, 7)
+
+    assert asyncio.run(make_handler(bot_module, seen)(bot, command_update(7), None)) == "done"
+    assert seen == [(7, True)]
+    assert bot.user_slots == {}
+
+
+def test_per_user_limit_turns_away_extra_commands(bot, bot_module):
+    started = []
+
+    @bot_module.per_user_limit
+    async def handler(self, update, context):
+        started.append(update.effective_user.id)
+        await asyncio.sleep(0.01)
+
+    updates = [command_update(7) for _ in range(5)] + [command_update(8)]
+
+    async def run():
+        await asyncio.gather(*(handler(bot, update, None) for update in updates))
+
+    asyncio.run(run())
+    limit = bot_module.USER_CONCURRENCY_LIMIT
+    assert started.count(7) == limit
+    assert started.count(8) == 1
+    assert [len(update.effective_message.replies) for update in updates] == [0] * limit + [1] * (5 - limit) + [0]
+    assert bot.user_slots == {}
+
+    # Slots are released once the running commands finish
+    asyncio.run(handler(bot, command_update(7), None))
+    assert started.count(7) == limit + 1
+
+
+def test_fanout_limit_is_shared_across_users(bot, bot_module):
+    bot.fanout_slots = asyncio.Semaphore(2)
+    running = []
+    peak = []
+
+    @bot_module.fanout_limit
+    async def handler(self, update, context):
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    async def run():
+        await asyncio.gather(*(handler(bot, command_update(user_id), None) for user_id in range(5)))
+
+    asyncio.run(run())
+    assert max(peak) == 2
+
+
+def test_button_runs_command_for_registered_user(bot):
+    registered(bot, 7)
+
+    async def no_balance(wallet_address):
+        return 0.0
+
+    async def prices(tokens):
+        return {token: 1.0 for token in tokens}
+
+    async def changes(tokens):
+        return {token: 0.0 for token in tokens}
+
+    bot.get_sol_balance = no_balance
+    bot.get_prices = prices
+    bot.get_price_changes = changes
+    update = button_update(7, "portfolio")
+
+    asyncio.run(bot.button_handler(update, None))
+    assert update.callback_query.answered
+    assert update.effective_message.replies == ["⏳ Loading portfolio..."]
+    assert "Portfolio Overview" in update.effective_message.edits[0]
+    assert update.callback_query.edits == []
+    assert bot.user_slots == {}
+
+
+def test_button_asks_unregistered_user_to_register(bot):
+    update = button_update(7, "portfolio")
+
+    asyncio.run(bot.button_handler(update, None))
+    assert update.effective_message.replies == ["Please /register first"]
+
+
+def test_unknown_button(bot):
+    update = button_update(7, "nope")
+
+    asyncio.run(bot.button_handler(update, None))
+    assert update.callback_query.edits == ["Action 'nope' not implemented yet"]
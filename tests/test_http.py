@@ -0,0 +1,88 @@
+import asyncio
+
+import httpx
+import pytest
+
+
+@pytest.fixture
+def sleeps(bot_module, monkeypatch):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(bot_module.asyncio, 'sleep', sleep)
+    return delays
+
+
+def fake_get(bot, monkeypatch, replies):
+    """Replace bot.client.get; replies are responses or exceptions to raise, in order"""
+    calls = []
+    replies = iter(replies)
+
+    async def get(url, **kwargs):
+        calls.append(url)
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    monkeypatch.setattr(bot.client, 'get', get)
+    return calls
+
+
+def test_retry_after_is_honored(bot, monkeypatch, sleeps):
+    fake_get(bot, monkeypatch, [httpx.Response(429, headers={'Retry-After': '3'}), httpx.Response(200)])
+
+    assert asyncio.run(bot.get_with_retry("https://api.test")).status_code == 200
+    assert sleeps == [3.0]
+
+
+def test_server_errors_back_off_exponentially(bot, monkeypatch, sleeps):
+    calls = fake_get(bot, monkeypatch, [httpx.Response(503), httpx.Response(502), httpx.Response(200)])
+
+    assert asyncio.run(bot.get_with_retry("https://api.test")).status_code == 200
+    assert len(calls) == 3
+    assert sleeps == [0.25, 0.5]
+
+
+def test_long_or_dated_retry_after_is_capped_or_ignored(bot, monkeypatch, sleeps, bot_module):
+    fake_get(bot, monkeypatch, [
+        httpx.Response(429, headers={'Retry-After': '120'}),
+        httpx.Response(429, headers={'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}),
+        httpx.Response(200),
+    ])
+
+    asyncio.run(bot.get_with_retry("https://api.test"))
+    assert sleeps == [bot_module.HTTP_MAX_RETRY_DELAY, 0.5]
+
+
+def test_final_rate_limited_response_is_returned(bot, monkeypatch, sleeps, bot_module):
+    calls = fake_get(bot, monkeypatch, [httpx.Response(429)] * (bot_module.HTTP_RETRIES + 1))
+
+    assert asyncio.run(bot.get_with_retry("https://api.test")).status_code == 429
+    assert len(calls) == bot_module.HTTP_RETRIES + 1
+    assert len(sleeps) == bot_module.HTTP_RETRIES
+
+
+def test_client_errors_are_not_retried(bot, monkeypatch, sleeps):
+    calls = fake_get(bot, monkeypatch, [httpx.Response(404)])
+
+    assert asyncio.run(bot.get_with_retry("https://api.test")).status_code == 404
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+def test_timeouts_are_retried(bot, monkeypatch, sleeps):
+    fake_get(bot, monkeypatch, [httpx.ReadTimeout("slow"), httpx.Response(200)])
+
+    assert asyncio.run(bot.get_with_retry("https://api.test")).status_code == 200
+    assert sleeps == [0.25]
+
+
+def test_timeout_on_last_attempt_is_raised(bot, monkeypatch, sleeps, bot_module):
+    fake_get(bot, monkeypatch, [httpx.ConnectTimeout("down")] * (bot_module.HTTP_RETRIES + 1))
+
+    with pytest.raises(httpx.ConnectTimeout):
+        asyncio.run(bot.get_with_retry("https://api.test"))
+    assert len(sleeps) == bot_module.HTTP_RETRIES
@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+
+BONK = 'DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263'
+WIF = 'EKpQGSJtjMFqKZ9KQanSqYXRcF8fBopzLHYxdM65zcjm'
+USDC = 'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v'
+
+
+def pair(base, quote, price, liquidity=1000):
+    return {
+        'baseToken': {'address': base},
+        'quoteToken': {'address': quote},
+        'priceUsd': str(price),
+        'liquidity': {'usd': liquidity},
+    }
+
+
+def fake_dexscreener(bot, pairs):
+    """Replace bot.get_with_retry with a DexScreener /tokens endpoint"""
+    requests = []
+
+    async def get_with_retry(url, **kwargs):
+        requests.append(url.rsplit('/', 1)[1].split(','))
+        await asyncio.sleep(0)
+        return SimpleNamespace(status_code=200, content=orjson.dumps({'pairs': pairs}))
+
+    bot.get_with_retry = get_with_retry
+    return requests
+
+
+def fake_fallback(bot, prices):
+    """Replace the per-token fallback chain"""
+    lookups = []
+
+    async def get_real_time_price(token):
+        lookups.append(token)
+        return prices.get(token)
+
+    bot.get_real_time_price = get_real_time_price
+    return lookups
+
+
+def test_bulk_prices_are_keyed_by_requested_token(bot):
+    # WIF only appears as the quote side of a pair whose base nobody asked for
+    requests = fake_dexscreener(bot, [
+        pair(BONK, USDC, 0.00002, liquidity=50),
+        pair(BONK, USDC, 0.00003, liquidity=500),
+        pair(USDC, WIF, 1.0),
+    ])
+    lookups = fake_fallback(bot, {'SOL': 150.0, WIF: 2.5})
+
+    prices = asyncio.run(bot.get_prices(['SOL', BONK, WIF, BONK]))
+
+    assert prices == {BONK: 0.00003, 'SOL': 150.0, WIF: 2.5}
+    assert requests == [[BONK, WIF]]
+    assert sorted(lookups) == sorted(['SOL', WIF])
+
+
+def test_addresses_match_case_sensitively(bot):
+    fake_dexscreener(bot, [pair(BONK.lower(), USDC, 1.0)])
+    lookups = fake_fallback(bot, {})
+
+    assert asyncio.run(bot.get_prices([BONK])) == {BONK: None}
+    assert lookups == [BONK]
+
+
+def test_bulk_prices_fill_the_price_cache(bot):
+    requests = fake_dexscreener(bot, [pair(BONK, USDC, 0.00003)])
+    fake_fallback(bot, {})
+
+    async def run():
+        first = await bot.get_prices([BONK])
+        second = await bot.get_prices([BONK])
+        return first, second
+
+    assert asyncio.run(run()) == ({BONK: 0.00003}, {BONK: 0.00003})
+    assert len(requests) == 1
+    assert bot.get_fresh_data(f"price_{BONK}") == 0.00003
+
+
+def test_concurrent_bulk_lookups_are_single_flight(bot):
+    requests = fake_dexscreener(bot, [pair(BONK, USDC, 0.00003), pair(WIF, USDC, 2.5)])
+    fake_fallback(bot, {})
+
+    async def run():
+        return await asyncio.gather(bot.get_prices([BONK, WIF]), bot.get_prices([WIF, BONK]))
+
+    assert asyncio.run(run()) == [{BONK: 0.00003, WIF: 2.5}] * 2
+    assert len(requests) == 1
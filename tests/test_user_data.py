@@ -0,0 +1,93 @@
+import asyncio
+
+import orjson
+
+
+def user(wallet, alerts=()):
+    return {
+        'wallet': wallet,
+        'registered': '2024-01-01T00:00:00',
+        'watchlist': [],
+        'alerts': list(alerts),
+        'portfolio': {},
+    }
+
+
+def use_tmp_files(monkeypatch, bot_module, tmp_path):
+    monkeypatch.setattr(bot_module, 'USER_DATA_DB', str(tmp_path / "users.db"))
+    monkeypatch.setattr(bot_module, 'USER_DATA_FILE', str(tmp_path / "users.json"))
+
+
+def test_read_user_data_converts_ids_to_int(bot_module, tmp_path):
+    path = tmp_path / "users.json"
+    path.write_bytes(orjson.dumps({"1": user("one"), "2": user("two")}))
+
+    assert bot_module.read_user_data(str(path)) == {1: user("one"), 2: user("two")}
+
+
+def test_load_user_data_imports_json_once(bot_module, tmp_path, monkeypatch):
+    use_tmp_files(monkeypatch, bot_module, tmp_path)
+    alert = {'token': 'SOL', 'direction': 'above', 'price': 200.0}
+    (tmp_path / "users.json").write_bytes(orjson.dumps({"1": user("one", [alert]), "2": user("two")}))
+
+    async def load():
+        trading_bot = bot_module.TradingBot("123456:TEST")
+        await trading_bot.open_user_db()
+        try:
+            await trading_bot.load_user_data()
+        finally:
+            await trading_bot.db.close()
+            await trading_bot.client.aclose()
+        return trading_bot
+
+    imported = asyncio.run(load())
+    assert imported.users_data == {1: user("one", [alert]), 2: user("two")}
+    assert imported.alert_index['SOL'] == {1}
+
+    # Later starts read the database; the JSON file is no longer consulted
+    (tmp_path / "users.json").write_bytes(orjson.dumps({"9": user("stale")}))
+    reloaded = asyncio.run(load())
+    assert reloaded.users_data == imported.users_data
+
+
+def test_store_users_upserts(bot, tmp_path, monkeypatch, bot_module):
+    use_tmp_files(monkeypatch, bot_module, tmp_path)
+
+    async def run():
+        await bot.open_user_db()
+        try:
+            bot.users_data = {1: user("one")}
+            await bot.store_users({1})
+            bot.users_data[1]['wallet'] = "changed"
+            await bot.store_users({1, 2})
+            bot.users_data = {}
+            await bot.load_user_data()
+        finally:
+            await bot.db.close()
+
+    asyncio.run(run())
+    assert bot.users_data == {1: user("changed")}
+
+
+def test_failed_write_is_retried(bot, monkeypatch, bot_module):
+    monkeypatch.setattr(bot_module, 'USER_DATA_FLUSH_DELAY', 0)
+    attempts = []
+
+    async def store_users(user_ids):
+        attempts.append(set(user_ids))
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+
+    bot.store_users = store_users
+
+    async def run():
+        writer = asyncio.create_task(bot.user_data_writer())
+        await bot.save_user_data(1)
+        await bot.save_user_data(2)
+        while len(attempts) < 2:
+            await asyncio.sleep(0)
+        writer.cancel()
+
+    asyncio.run(run())
+    assert attempts == [{1, 2}, {1, 2}]
+    assert bot.write_queue.empty()